@@ -1,173 +1,205 @@
-#!/usr/bin/env python3
-"""CompliGator — run with: python3 compligator.py"""
-
-from __future__ import annotations
-
-import os
-import subprocess
-import sys
-from pathlib import Path
-
-SCRIPT_DIR = Path(__file__).resolve().parent
-VENV_DIR = SCRIPT_DIR / ".compligator-venv"
-VENV_PYTHON = VENV_DIR / "bin" / "python3"
-
-REQUIRED = [
-    ("requests",       "requests"),
-    ("beautifulsoup4", "bs4"),
-    ("pymupdf",        "fitz"),
-    ("playwright",     "playwright"),
-]
-
-
-def _missing(python: Path) -> list[str]:
-    missing = []
-    for pkg_name, import_name in REQUIRED:
-        r = subprocess.run(
-            [str(python), "-c", f"import {import_name}"],
-            capture_output=True,
-        )
-        if r.returncode != 0:
-            missing.append(pkg_name)
-    return missing
-
-
-def _has_pip() -> bool:
-    r = subprocess.run([str(VENV_PYTHON), "-m", "pip", "--version"], capture_output=True)
-    return r.returncode == 0
-
-
-def _venv_ok() -> bool:
-    """True if venv exists and has a working pip."""
-    return VENV_DIR.exists() and VENV_PYTHON.exists() and _has_pip()
-
-
-def _can_create_venv() -> bool:
-    try:
-        import ensurepip  # noqa: F401
-        return True
-    except ImportError:
-        return False
-
-
-def _bootstrap() -> None:
-    """Ensure a local venv exists with required packages, then re-exec inside it."""
-    import shutil
-
-    # Detect and remove a broken venv (has Python but no pip)
-    if VENV_DIR.exists() and not _venv_ok():
-        shutil.rmtree(VENV_DIR)
-
-    if not VENV_DIR.exists():
-        if not _can_create_venv():
-            ver = f"{sys.version_info.major}.{sys.version_info.minor}"
-            print("CompliGator needs a local environment but cannot create one.\n")
-            print("On Debian/Ubuntu, install the missing package first:")
-            print(f"  sudo apt install python{ver}-venv")
-            print("\nThen run the script again.")
-            sys.exit(1)
-
-        pkg_list = ", ".join(pkg for pkg, _ in REQUIRED)
-        print("CompliGator needs a local environment to run.\n")
-        print(f"It will be created at: {VENV_DIR}")
-        print(f"Packages to install  : {pkg_list}\n")
-        try:
-            answer = input("Set it up now? [y/N] ").strip().lower()
-        except (KeyboardInterrupt, EOFError):
-            print()
-            sys.exit(1)
-        if answer not in ("y", "yes"):
-            print("Aborted.")
-            sys.exit(1)
-
-        print("Creating environment...", end="", flush=True)
-        import venv as _venv
-        try:
-            _venv.create(str(VENV_DIR), with_pip=True)
-            print(" done.")
-        except BaseException:
-            print(" failed.")
-            if VENV_DIR.exists():
-                shutil.rmtree(VENV_DIR)
-            ver = f"{sys.version_info.major}.{sys.version_info.minor}"
-            print("\nCould not create a virtual environment.")
-            print("On Debian/Ubuntu, install the missing package first:")
-            print(f"  sudo apt install python{ver}-venv")
-            sys.exit(1)
-
-    missing = _missing(VENV_PYTHON)
-    if missing:
-        print(f"Installing: {', '.join(missing)}...", end="", flush=True)
-        result = subprocess.run(
-            [str(VENV_PYTHON), "-m", "pip", "install", "--quiet"] + missing
-        )
-        if result.returncode != 0:
-            print(" failed.")
-            print(f"\nTry manually: {VENV_PYTHON} -m pip install {' '.join(missing)}")
-            sys.exit(1)
-        print(" done.")
-        print()
-
-    _ensure_playwright_browser()
-    os.execv(str(VENV_PYTHON), [str(VENV_PYTHON), __file__] + sys.argv[1:])
-
-
-def _playwright_browser_ok() -> bool:
-    """Return True if Playwright's Chromium browser can be launched."""
-    try:
-        r = subprocess.run(
-            [str(VENV_PYTHON), "-c",
-             "from playwright.sync_api import sync_playwright;"
-             "p=sync_playwright().start();"
-             "p.chromium.launch(headless=True,args=['--no-sandbox']).close();"
-             "p.stop()"],
-            capture_output=True,
-            timeout=20,
-        )
-        return r.returncode == 0
-    except (subprocess.TimeoutExpired, OSError):
-        return False
-
-
-def _ensure_playwright_browser() -> None:
-    """Prompt once to install the Playwright Chromium browser if not already present."""
-    if _playwright_browser_ok():
-        return
-    print("Playwright browser (Chromium) is not installed.")
-    print("It enables automatic download for JavaScript-protected sites (e.g. CISA BOD).")
-    print("Browser download is ~150 MB and is a one-time operation.")
-    try:
-        answer = input("Install Playwright browser now? [y/N] ").strip().lower()
-    except (KeyboardInterrupt, EOFError):
-        print()
-        return
-    if answer not in ("y", "yes"):
-        print("Skipped. CISA BOD automatic sync will require manual download.")
-        print()
-        return
-    print("Installing Playwright browser...", end="", flush=True)
-    r = subprocess.run(
-        [str(VENV_PYTHON), "-m", "playwright", "install", "chromium"],
-        capture_output=True,
-    )
-    if r.returncode == 0:
-        print(" done.")
-    else:
-        print(" failed.")
-        print(f"Run manually: {VENV_PYTHON} -m playwright install chromium")
-    print()
-
-
-def _in_managed_venv() -> bool:
-    return Path(sys.executable).resolve().is_relative_to(VENV_DIR)
-
-
-if not _in_managed_venv():
-    _bootstrap()
-
-# Running inside .compligator-venv — all deps are present
-sys.path.insert(0, str(SCRIPT_DIR))
-from compligator.cli import main  # noqa: E402
-
-if __name__ == "__main__":
-    main()
+#!/usr/bin/env python3
+"""CompliGator — run with: python3 compligator.py"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+VENV_DIR = SCRIPT_DIR / ".compligator-venv"
+VENV_PYTHON = VENV_DIR / "bin" / "python3"
+AUTO_YES_ENV = "COMPLIGATOR_AUTO_YES"
+
+REQUIRED = [
+    ("requests",       "requests"),
+    ("beautifulsoup4", "bs4"),
+    ("lxml",           "lxml"),
+    ("pymupdf",        "fitz"),
+    ("playwright",     "playwright"),
+    ("orjson",         "orjson"),
+    ("blake3",         "blake3"),
+]
+
+
+def _missing(python: Path) -> list[str]:
+    """Return the REQUIRED packages that *python* cannot find.
+
+    One interpreter checks every package with find_spec, which locates modules
+    without importing them — no per-package process start or heavy import.
+    """
+    code = (
+        "import sys\n"
+        "from importlib.util import find_spec\n"
+        "print(' '.join(n for n in sys.argv[1:] if find_spec(n) is None))"
+    )
+    r = subprocess.run(
+        [str(python), "-c", code] + [import_name for _, import_name in REQUIRED],
+        capture_output=True,
+        text=True,
+    )
+    if r.returncode != 0:
+        return [pkg_name for pkg_name, _ in REQUIRED]
+    absent = set(r.stdout.split())
+    return [pkg_name for pkg_name, import_name in REQUIRED if import_name in absent]
+
+
+def _auto_yes() -> bool:
+    """True if setup prompts should be accepted without asking.
+
+    Set by passing -y/--yes or by setting COMPLIGATOR_AUTO_YES, so first-run
+    setup can complete unattended (CI, schedulers).
+    """
+    if "-y" in sys.argv[1:] or "--yes" in sys.argv[1:]:
+        return True
+    return os.environ.get(AUTO_YES_ENV, "").strip().lower() in ("1", "true", "yes", "y")
+
+
+def _has_pip() -> bool:
+    r = subprocess.run([str(VENV_PYTHON), "-m", "pip", "--version"], capture_output=True)
+    return r.returncode == 0
+
+
+def _venv_ok() -> bool:
+    """True if venv exists and has a working pip."""
+    return VENV_DIR.exists() and VENV_PYTHON.exists() and _has_pip()
+
+
+def _can_create_venv() -> bool:
+    try:
+        import ensurepip  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _bootstrap() -> None:
+    """Ensure a local venv exists with required packages, then re-exec inside it."""
+    import shutil
+
+    # Detect and remove a broken venv (has Python but no pip)
+    if VENV_DIR.exists() and not _venv_ok():
+        shutil.rmtree(VENV_DIR)
+
+    if not VENV_DIR.exists():
+        if not _can_create_venv():
+            ver = f"{sys.version_info.major}.{sys.version_info.minor}"
+            print("CompliGator needs a local environment but cannot create one.\n")
+            print("On Debian/Ubuntu, install the missing package first:")
+            print(f"  sudo apt install python{ver}-venv")
+            print("\nThen run the script again.")
+            sys.exit(1)
+
+        pkg_list = ", ".join(pkg for pkg, _ in REQUIRED)
+        print("CompliGator needs a local environment to run.\n")
+        print(f"It will be created at: {VENV_DIR}")
+        print(f"Packages to install  : {pkg_list}\n")
+        if _auto_yes():
+            answer = "y"
+        else:
+            try:
+                answer = input("Set it up now? [y/N] ").strip().lower()
+            except (KeyboardInterrupt, EOFError):
+                print()
+                sys.exit(1)
+        if answer not in ("y", "yes"):
+            print("Aborted.")
+            sys.exit(1)
+
+        print("Creating environment...", end="", flush=True)
+        import venv as _venv
+        try:
+            _venv.create(str(VENV_DIR), with_pip=True)
+            print(" done.")
+        except BaseException:
+            print(" failed.")
+            if VENV_DIR.exists():
+                shutil.rmtree(VENV_DIR)
+            ver = f"{sys.version_info.major}.{sys.version_info.minor}"
+            print("\nCould not create a virtual environment.")
+            print("On Debian/Ubuntu, install the missing package first:")
+            print(f"  sudo apt install python{ver}-venv")
+            sys.exit(1)
+
+    missing = _missing(VENV_PYTHON)
+    if missing:
+        print(f"Installing: {', '.join(missing)}...", end="", flush=True)
+        result = subprocess.run(
+            [str(VENV_PYTHON), "-m", "pip", "install", "--quiet"] + missing
+        )
+        if result.returncode != 0:
+            print(" failed.")
+            print(f"\nTry manually: {VENV_PYTHON} -m pip install {' '.join(missing)}")
+            sys.exit(1)
+        print(" done.")
+        print()
+
+    _ensure_playwright_browser()
+    os.execv(str(VENV_PYTHON), [str(VENV_PYTHON), __file__] + sys.argv[1:])
+
+
+def _playwright_browser_ok() -> bool:
+    """Return True if Playwright's Chromium browser can be launched."""
+    try:
+        r = subprocess.run(
+            [str(VENV_PYTHON), "-c",
+             "from playwright.sync_api import sync_playwright;"
+             "p=sync_playwright().start();"
+             "p.chromium.launch(headless=True,args=['--no-sandbox']).close();"
+             "p.stop()"],
+            capture_output=True,
+            timeout=20,
+        )
+        return r.returncode == 0
+    except (subprocess.TimeoutExpired, OSError):
+        return False
+
+
+def _ensure_playwright_browser() -> None:
+    """Prompt once to install the Playwright Chromium browser if not already present."""
+    if _playwright_browser_ok():
+        return
+    print("Playwright browser (Chromium) is not installed.")
+    print("It enables automatic download for JavaScript-protected sites (e.g. CISA BOD).")
+    print("Browser download is ~150 MB and is a one-time operation.")
+    if _auto_yes():
+        answer = "y"
+    else:
+        try:
+            answer = input("Install Playwright browser now? [y/N] ").strip().lower()
+        except (KeyboardInterrupt, EOFError):
+            print()
+            return
+    if answer not in ("y", "yes"):
+        print("Skipped. CISA BOD automatic sync will require manual download.")
+        print()
+        return
+    print("Installing Playwright browser...", end="", flush=True)
+    r = subprocess.run(
+        [str(VENV_PYTHON), "-m", "playwright", "install", "chromium"],
+        capture_output=True,
+    )
+    if r.returncode == 0:
+        print(" done.")
+    else:
+        print(" failed.")
+        print(f"Run manually: {VENV_PYTHON} -m playwright install chromium")
+    print()
+
+
+def _in_managed_venv() -> bool:
+    return Path(sys.executable).resolve().is_relative_to(VENV_DIR)
+
+
+if not _in_managed_venv():
+    _bootstrap()
+
+# Running inside .compligator-venv — all deps are present
+sys.path.insert(0, str(SCRIPT_DIR))
+
+if __name__ == "__main__":
+    from compligator.cli import main
+
+    main()
@@ -1,189 +1,222 @@
-"""CompliGator — compliance document aggregator."""
-
-from __future__ import annotations
-
-import sys
-from pathlib import Path
-
-# ---------------------------------------------------------------------------
-# Dependency check — must run before any third-party imports
-# ---------------------------------------------------------------------------
-
-def _check_dependencies() -> None:
-    """Verify required packages are installed and print install instructions if not."""
-    required = [
-        ("requests",       "requests"),
-        ("beautifulsoup4", "bs4"),
-        ("pymupdf",        "fitz"),
-    ]
-    missing_pkgs = []
-    for pkg_name, import_name in required:
-        try:
-            __import__(import_name)
-        except ImportError:
-            missing_pkgs.append(pkg_name)
-
-    if missing_pkgs:
-        print("CompliGator is missing required packages:\n")
-        for pkg in missing_pkgs:
-            print(f"  - {pkg}")
-        print()
-        print("Run the tool via compligator.py to install automatically:")
-        print("  python3 compligator.py")
-        print()
-        sys.exit(1)
-
-
-# ---------------------------------------------------------------------------
-# Display helpers
-# ---------------------------------------------------------------------------
-
-def _human_size(n: int) -> str:
-    size = float(n)
-    for unit in ("B", "KB", "MB", "GB"):
-        if size < 1024:
-            return f"{size:.1f} {unit}"
-        size /= 1024
-    return f"{size:.1f} TB"
-
-
-def _print_menu(services, entries: dict) -> None:
-    print()
-    print("CompliGator")
-    print("-" * 52)
-
-    for i, svc in enumerate(services, 1):
-        prefix = svc.subdir + "/"
-        svc_entries = {k: v for k, v in entries.items() if k.startswith(prefix)}
-
-        if svc_entries:
-            count = len(svc_entries)
-            size  = _human_size(sum(e["size"] for e in svc_entries.values()))
-            last  = max(e["recorded_at"] for e in svc_entries.values())[:10]
-            info  = f"{count} files  {size}  last synced {last}"
-        else:
-            info  = "never synced"
-
-        print(f"  {i}. {svc.label:<32} {info}")
-
-    sync_all_n = len(services) + 1
-    normalize_n = len(services) + 2
-    print()
-    print(f"  {sync_all_n}. Sync All")
-    print(f"  {normalize_n}. Normalize Downloaded Documents")
-    print("  0. Quit")
-    print()
-
-
-def _run_sync(svc, output_dir: Path, state) -> None:
-    print(f"Syncing {svc.label}...", end="", flush=True)
-    try:
-        result = svc.runner(output_dir, dry_run=False, force=False, state=state)
-        print(" done.")
-        if result.downloaded:
-            print(f"  Downloaded : {len(result.downloaded)}")
-        if result.skipped:
-            print(f"  Up to date : {len(result.skipped)}")
-        if result.errors:
-            print(f"  Errors     : {len(result.errors)}")
-            for name, err in result.errors:
-                print(f"    {name}: {err}")
-        if result.manual_required:
-            print("  Manual download required:")
-            for label, url in result.manual_required:
-                print(f"    {label}")
-                print(f"    {url}")
-        if result.notices:
-            print()
-            for notice in result.notices:
-                print(f"  [!] {notice}")
-    except Exception as exc:  # noqa: BLE001
-        print(f" failed.\n  Error: {exc}")
-
-
-def _run_normalize(source_dir: Path, output_dir: Path) -> None:
-    from compligator.normalizer import normalize_all
-
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    seen_frameworks: set[str] = set()
-
-    def _progress(framework_key: str, filename: str) -> None:
-        if framework_key not in seen_frameworks:
-            seen_frameworks.add(framework_key)
-            print(f"  Normalizing {framework_key}...", flush=True)
-
-    print("Normalizing downloaded documents...")
-    print("  (This may take a while for large collections.)")
-    print()
-
-    try:
-        result = normalize_all(source_dir, output_dir, force=False, progress_callback=_progress)
-    except Exception as exc:  # noqa: BLE001
-        print(f"  Normalization failed: {exc}")
-        return
-
-    print()
-    if result.processed:
-        print(f"  Normalized   : {len(result.processed)}")
-    if result.skipped:
-        print(f"  Already done : {len(result.skipped)}")
-    if result.unsupported:
-        print(f"  Skipped (unsupported format) : {len(result.unsupported)}")
-    if result.errors:
-        print(f"  Errors       : {len(result.errors)}")
-        for name, err in result.errors:
-            print(f"    {name}: {err}")
-    if not result.processed and not result.skipped and not result.errors:
-        print("  Nothing to normalize — sync a framework first.")
-
-    print()
-    print(f"  Output: {output_dir}/")
-
-
-# ---------------------------------------------------------------------------
-# Entry point
-# ---------------------------------------------------------------------------
-
-def main() -> None:
-    _check_dependencies()
-
-    # Lazy imports — only reached if dependencies are present
-    from compligator.downloaders import SERVICES
-    from compligator.state import StateFile
-
-    source_dir = Path("source-content")
-    normalized_dir = Path("normalized-content")
-    source_dir.mkdir(parents=True, exist_ok=True)
-    state = StateFile(source_dir)
-
-    while True:
-        _print_menu(SERVICES, state.entries())
-
-        try:
-            choice = input("Select: ").strip()
-        except (KeyboardInterrupt, EOFError):
-            print("\nGoodbye.")
-            break
-
-        if choice == "0":
-            print("Goodbye.")
-            break
-
-        if not choice.isdigit():
-            print("Invalid selection.")
-            continue
-
-        n = int(choice)
-        sync_all_n = len(SERVICES) + 1
-        normalize_n = len(SERVICES) + 2
-
-        if 1 <= n <= len(SERVICES):
-            _run_sync(SERVICES[n - 1], source_dir, state)
-        elif n == sync_all_n:
-            for svc in SERVICES:
-                _run_sync(svc, source_dir, state)
-        elif n == normalize_n:
-            _run_normalize(source_dir, normalized_dir)
-        else:
-            print("Invalid selection.")
+"""CompliGator — compliance document aggregator."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Mapping
+
+# ---------------------------------------------------------------------------
+# Dependency check — must run before any third-party imports
+# ---------------------------------------------------------------------------
+
+def _check_dependencies() -> None:
+    """Verify required packages are installed and print install instructions if not.
+
+    Uses find_spec so the packages are located but not imported — the heavy
+    imports (fitz in particular) are deferred until they are actually used.
+    """
+    from importlib.util import find_spec
+
+    required = [
+        ("requests",       "requests"),
+        ("beautifulsoup4", "bs4"),
+        ("lxml",           "lxml"),
+        ("pymupdf",        "fitz"),
+    ]
+    missing_pkgs = [pkg for pkg, import_name in required if find_spec(import_name) is None]
+
+    if missing_pkgs:
+        print("CompliGator is missing required packages:\n")
+        for pkg in missing_pkgs:
+            print(f"  - {pkg}")
+        print()
+        print("Run the tool via compligator.py to install automatically:")
+        print("  python3 compligator.py")
+        print()
+        sys.exit(1)
+
+
+# ---------------------------------------------------------------------------
+# Display helpers
+# ---------------------------------------------------------------------------
+
+def _human_size(n: int) -> str:
+    size = float(n)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def _print_menu(services, entries: Mapping[str, dict]) -> None:
+    # Build the whole menu first and emit it with a single write so the
+    # terminal redraws once instead of once per line.
+    lines = ["", "CompliGator", "-" * 52]
+
+    # One pass over the state instead of one per service: each entry is added
+    # to every service subdir that is an ancestor of its key.
+    # Values are [count, total size, latest recorded_at].
+    totals: dict[str, list] = {svc.subdir: [0, 0, ""] for svc in services}
+    for key, entry in entries.items():
+        end = key.find("/")
+        while end != -1:
+            t = totals.get(key[:end])
+            if t is not None:
+                t[0] += 1
+                t[1] += entry["size"]
+                if entry["recorded_at"] > t[2]:
+                    t[2] = entry["recorded_at"]
+            end = key.find("/", end + 1)
+
+    for i, svc in enumerate(services, 1):
+        count, total, last = totals[svc.subdir]
+
+        if count:
+            size  = _human_size(total)
+            info  = f"{count} files  {size}  last synced {last[:10]}"
+        else:
+            info  = "never synced"
+
+        lines.append(f"  {i}. {svc.label:<32} {info}")
+
+    sync_all_n = len(services) + 1
+    normalize_n = len(services) + 2
+    recheck_n = len(services) + 3
+    lines += [
+        "",
+        f"  {sync_all_n}. Sync All",
+        f"  {normalize_n}. Normalize Downloaded Documents",
+        f"  {recheck_n}. Re-check All With Servers",
+        "  0. Quit",
+        "",
+    ]
+    print("\n".join(lines), flush=True)
+
+
+def _run_sync(svc, output_dir: Path, state, force: bool = False) -> None:
+    """Sync one service; with *force*, revalidate every file with the server.
+
+    A forced sync does not trust the local state: each file is re-checked
+    with a conditional GET (or a HEAD when no validators were recorded) and
+    re-downloaded only if the server reports a change.
+    """
+    verb = "Re-checking" if force else "Syncing"
+    print(f"{verb} {svc.label}...", end="", flush=True)
+    try:
+        result = svc.runner(output_dir, dry_run=False, force=force, state=state)
+        lines = [" done."]
+        if result.downloaded:
+            lines.append(f"  Downloaded : {len(result.downloaded)}")
+        if result.skipped:
+            lines.append(f"  Up to date : {len(result.skipped)}")
+        if result.errors:
+            lines.append(f"  Errors     : {len(result.errors)}")
+            for name, err in result.errors:
+                lines.append(f"    {name}: {err}")
+        if result.manual_required:
+            lines.append("  Manual download required:")
+            for label, url in result.manual_required:
+                lines.append(f"    {label}")
+                lines.append(f"    {url}")
+        if result.notices:
+            lines.append("")
+            for notice in result.notices:
+                lines.append(f"  [!] {notice}")
+        print("\n".join(lines), flush=True)
+    except Exception as exc:  # noqa: BLE001
+        print(f" failed.\n  Error: {exc}")
+    finally:
+        state.flush()
+
+
+def _run_normalize(source_dir: Path, output_dir: Path) -> None:
+    from compligator.normalizer import normalize_all
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    seen_frameworks: set[str] = set()
+
+    def _progress(framework_key: str, filename: str) -> None:
+        if framework_key not in seen_frameworks:
+            seen_frameworks.add(framework_key)
+            print(f"  Normalizing {framework_key}...", flush=True)
+
+    print("Normalizing downloaded documents...")
+    print("  (This may take a while for large collections.)")
+    print()
+
+    try:
+        result = normalize_all(source_dir, output_dir, force=False, progress_callback=_progress)
+    except Exception as exc:  # noqa: BLE001
+        print(f"  Normalization failed: {exc}")
+        return
+
+    print()
+    if result.processed:
+        print(f"  Normalized   : {len(result.processed)}")
+    if result.skipped:
+        print(f"  Already done : {len(result.skipped)}")
+    if result.unsupported:
+        print(f"  Skipped (unsupported format) : {len(result.unsupported)}")
+    if result.errors:
+        print(f"  Errors       : {len(result.errors)}")
+        for name, err in result.errors:
+            print(f"    {name}: {err}")
+    if not result.processed and not result.skipped and not result.errors:
+        print("  Nothing to normalize — sync a framework first.")
+
+    print()
+    print(f"  Output: {output_dir}/")
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def main() -> None:
+    _check_dependencies()
+
+    # Lazy imports — only reached if dependencies are present
+    from compligator.downloaders import SERVICES
+    from compligator.state import StateFile
+
+    source_dir = Path("source-content")
+    normalized_dir = Path("normalized-content")
+    source_dir.mkdir(parents=True, exist_ok=True)
+    with StateFile(source_dir) as state:
+        while True:
+            _print_menu(SERVICES, state.entries())
+
+            try:
+                choice = input("Select: ").strip()
+            except (KeyboardInterrupt, EOFError):
+                print("\nGoodbye.")
+                break
+
+            if choice == "0":
+                print("Goodbye.")
+                break
+
+            if not choice.isdigit():
+                print("Invalid selection.")
+                continue
+
+            n = int(choice)
+            sync_all_n = len(SERVICES) + 1
+            normalize_n = len(SERVICES) + 2
+            recheck_n = len(SERVICES) + 3
+
+            if 1 <= n <= len(SERVICES):
+                _run_sync(SERVICES[n - 1], source_dir, state)
+            elif n == sync_all_n:
+                for svc in SERVICES:
+                    _run_sync(svc, source_dir, state)
+            elif n == normalize_n:
+                _run_normalize(source_dir, normalized_dir)
+            elif n == recheck_n:
+                for svc in SERVICES:
+                    _run_sync(svc, source_dir, state, force=True)
+            else:
+                print("Invalid selection.")
@@ -1,37 +1,65 @@
-"""Downloader registry — maps CLI framework keys to runner functions."""
-
-from __future__ import annotations
-
-from dataclasses import dataclass
-from pathlib import Path
-from typing import TYPE_CHECKING, Callable, Optional
-
-from . import cisa_bod, cmmc, disa, fedramp, fedramp_github, nist, nist_oscal
-from .base import DownloadResult
-
-if TYPE_CHECKING:
-    from compligator.state import StateFile
-
-
-@dataclass(frozen=True)
-class ServiceDef:
-    key: str
-    label: str
-    runner: Callable[[Path, bool, bool, Optional["StateFile"]], DownloadResult]
-    subdir: str  # path prefix under output_dir used by this downloader
-
-
-SERVICES: list[ServiceDef] = [
-    ServiceDef("fedramp", "FedRAMP", fedramp.run, "fedramp"),
-    ServiceDef("nist-finals", "NIST Final Publications", nist.run_finals, "nist/final-pubs"),
-    ServiceDef("nist-drafts", "NIST Draft Publications", nist.run_drafts, "nist/draft-pubs"),
-    ServiceDef("cmmc", "CMMC", cmmc.run, "cmmc"),
-    ServiceDef("disa", "DISA STIGs", disa.run, "disa-stigs"),
-    ServiceDef("cisa-bod", "CISA Binding Operational Directives", cisa_bod.run, "cisa-bod"),
-    ServiceDef("nist-oscal", "NIST OSCAL Content", nist_oscal.run, "nist-oscal"),
-    ServiceDef(
-        "fedramp-github", "FedRAMP Automation (GitHub)", fedramp_github.run, "fedramp-github"
-    ),
-]
-
-SERVICES_BY_KEY: dict[str, ServiceDef] = {s.key: s for s in SERVICES}
+"""Downloader registry — maps CLI framework keys to runner functions.
+
+Downloader modules (and their requests/bs4 imports) are loaded lazily: the
+registry only names each runner, and the module is imported the first time
+its runner is used. Showing the menu or normalizing never imports them.
+"""
+
+from __future__ import annotations
+
+import importlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from compligator.state import StateFile
+
+    from .base import DownloadResult
+
+_SUBMODULES = {
+    "base",
+    "cisa_bod",
+    "cmmc",
+    "disa",
+    "fedramp",
+    "fedramp_github",
+    "nist",
+    "nist_oscal",
+}
+
+
+def __getattr__(name: str):
+    """Import downloader submodules on first attribute access (PEP 562)."""
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@dataclass(frozen=True)
+class ServiceDef:
+    key: str
+    label: str
+    entry_point: str  # "<module>.<function>" in this package, imported on first use
+    subdir: str  # path prefix under output_dir used by this downloader
+
+    @property
+    def runner(self) -> Callable[[Path, bool, bool, Optional["StateFile"]], "DownloadResult"]:
+        module_name, func_name = self.entry_point.rsplit(".", 1)
+        return getattr(importlib.import_module(f".{module_name}", __name__), func_name)
+
+
+SERVICES: list[ServiceDef] = [
+    ServiceDef("fedramp", "FedRAMP", "fedramp.run", "fedramp"),
+    ServiceDef("nist-finals", "NIST Final Publications", "nist.run_finals", "nist/final-pubs"),
+    ServiceDef("nist-drafts", "NIST Draft Publications", "nist.run_drafts", "nist/draft-pubs"),
+    ServiceDef("cmmc", "CMMC", "cmmc.run", "cmmc"),
+    ServiceDef("disa", "DISA STIGs", "disa.run", "disa-stigs"),
+    ServiceDef("cisa-bod", "CISA Binding Operational Directives", "cisa_bod.run", "cisa-bod"),
+    ServiceDef("nist-oscal", "NIST OSCAL Content", "nist_oscal.run", "nist-oscal"),
+    ServiceDef(
+        "fedramp-github", "FedRAMP Automation (GitHub)", "fedramp_github.run", "fedramp-github"
+    ),
+]
+
+SERVICES_BY_KEY: dict[str, ServiceDef] = {s.key: s for s in SERVICES}
@@ -1,105 +1,639 @@
-"""Shared types and utilities for all downloaders."""
-
-from __future__ import annotations
-
-import re
-import time
-from dataclasses import dataclass, field
-from pathlib import Path
-from typing import TYPE_CHECKING, Optional
-
-import requests
-
-if TYPE_CHECKING:
-    from compligator.state import StateFile
-
-USER_AGENT = (
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-)
-REQUEST_TIMEOUT = 30
-DOWNLOAD_TIMEOUT = 120
-REQUEST_RETRIES = 3
-RETRY_DELAY = 2.0
-RATE_LIMIT_DELAY = 0.25
-
-
-@dataclass
-class DownloadResult:
-    framework: str
-    downloaded: list[str] = field(default_factory=list)
-    skipped: list[str] = field(default_factory=list)
-    errors: list[tuple[str, str]] = field(default_factory=list)
-    manual_required: list[tuple[str, str]] = field(default_factory=list)
-    notices: list[str] = field(default_factory=list)
-
-    @property
-    def total(self) -> int:
-        return len(self.downloaded) + len(self.skipped) + len(self.errors)
-
-
-def sanitize_filename(name: str) -> str:
-    safe = re.sub(r"[^a-zA-Z0-9._-]+", "_", name)
-    return safe.strip("_") or "file"
-
-
-def download_file(
-    session: requests.Session,
-    url: str,
-    dest: Path,
-    *,
-    force: bool = False,
-    referer: Optional[str] = None,
-    state: Optional["StateFile"] = None,
-) -> tuple[bool, str]:
-    """Download url to dest. Returns (success, message)."""
-    if not force:
-        if state is not None:
-            if state.needs_adopt(dest):
-                state.adopt(dest, url)
-            if state.is_fresh(dest, url):
-                return True, "skipped"
-        elif dest.exists() and dest.stat().st_size > 0:
-            return True, "skipped"
-
-    headers: dict[str, str] = {"User-Agent": USER_AGENT}
-    if referer:
-        headers["Referer"] = referer
-
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    time.sleep(RATE_LIMIT_DELAY)
-
-    for attempt in range(REQUEST_RETRIES):
-        try:
-            with session.get(url, headers=headers, timeout=DOWNLOAD_TIMEOUT, stream=True) as resp:
-                if resp.status_code == 200:
-                    with dest.open("wb") as fh:
-                        for chunk in resp.iter_content(chunk_size=8192):
-                            if chunk:
-                                fh.write(chunk)
-                    if dest.stat().st_size == 0:
-                        dest.unlink(missing_ok=True)
-                        raise OSError("Empty file after download")
-                    if state is not None:
-                        state.record(dest, url)
-                    return True, "downloaded"
-                if resp.status_code == 404:
-                    return False, "not found (404)"
-        except requests.RequestException as exc:
-            if attempt < REQUEST_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
-            else:
-                return False, f"failed after {REQUEST_RETRIES} attempts: {exc}"
-
-    return False, "failed after retries"
-
-
-def require_playwright() -> None:
-    """Raise a clear error if Playwright is not installed."""
-    try:
-        import playwright  # noqa: F401
-    except ImportError as exc:
-        raise RuntimeError(
-            "Playwright is required but not installed.\n"
-            "Run: pip install playwright && playwright install chromium"
-        ) from exc
+"""Shared types and utilities for all downloaders."""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Optional
+from urllib.parse import ParseResult, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+from urllib3.util.retry import Retry
+
+from compligator.state import new_hasher, write_atomic
+
+if TYPE_CHECKING:
+    from compligator.state import StateFile
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+REQUEST_TIMEOUT = 30
+DOWNLOAD_TIMEOUT = 120
+REQUEST_RETRIES = 3
+# Downloads across all worker threads share one token bucket: up to
+# RATE_LIMIT_BURST requests go out back to back, then one per RATE_LIMIT_DELAY.
+RATE_LIMIT_DELAY = 0.25
+RATE_LIMIT_BURST = 5
+# Up to 1 MiB per read: the write + hash loop runs once per chunk, so larger chunks
+# mean far fewer Python-level iterations on multi-MB documents.
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Connection pool for the shared session: one pool per host, sized for the
+# largest downloader thread pool hitting a single host.
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 32
+
+# Transient failures (connection errors, RETRY_STATUSES) are retried by the
+# shared session's adapter with exponential backoff, capped at BACKOFF_CAP, plus
+# up to BACKOFF_BASE seconds of jitter. Retry-After is honored up to the cap.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+# BeautifulSoup tree builder: lxml's C parser (a required dependency).
+HTML_PARSER = "lxml"
+
+GITHUB_API_BASE = "https://api.github.com/repos"
+GITHUB_RAW_BASE = "https://raw.githubusercontent.com"
+
+
+@dataclass
+class DownloadResult:
+    framework: str
+    downloaded: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    errors: list[tuple[str, str]] = field(default_factory=list)
+    manual_required: list[tuple[str, str]] = field(default_factory=list)
+    notices: list[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return len(self.downloaded) + len(self.skipped) + len(self.errors)
+
+
+class _Retry(Retry):
+    """urllib3 Retry with jittered backoff and Retry-After capped at BACKOFF_CAP."""
+
+    def get_backoff_time(self) -> float:
+        backoff = min(BACKOFF_CAP, super().get_backoff_time())
+        return backoff + random.uniform(0, BACKOFF_BASE)
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(BACKOFF_CAP, retry_after)
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    Holds up to *capacity* tokens, refilled at *rate* per second. acquire()
+    takes one token, sleeping only when the bucket is empty, so idle periods
+    let a burst through at full speed while sustained load is held to *rate*.
+    """
+
+    def __init__(self, capacity: float, rate: float) -> None:
+        self._capacity = capacity
+        self._rate = rate
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._last) * self._rate)
+            self._last = now
+            # Reserve the token now (possibly going negative) so waiting
+            # threads queue up in order instead of racing for the next refill.
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class HostLimiter:
+    """Per-host politeness limits for crawlers that talk to several hosts.
+
+    Each host gets its own TokenBucket(burst, rate) and at most *concurrency*
+    requests in flight, so pacing one host never stalls requests to another.
+    """
+
+    def __init__(self, rate: float, *, burst: float = 1, concurrency: int = 4) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._concurrency = concurrency
+        self._hosts: dict[str, tuple[threading.BoundedSemaphore, TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        """Hold one of the host's request slots, paced by its token bucket."""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            limits = self._hosts.get(host)
+            if limits is None:
+                limits = (
+                    threading.BoundedSemaphore(self._concurrency),
+                    TokenBucket(self._burst, self._rate),
+                )
+                self._hosts[host] = limits
+        semaphore, bucket = limits
+        with semaphore:
+            bucket.acquire()
+            yield
+
+
+_download_bucket = TokenBucket(RATE_LIMIT_BURST, 1 / RATE_LIMIT_DELAY)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide HTTP session.
+
+    Every downloader shares it, so keep-alive connections and TLS sessions
+    survive across files and across services in Sync All. Its adapter retries
+    connection errors and RETRY_STATUSES responses, so callers make one call.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+            retry = _Retry(
+                total=REQUEST_RETRIES - 1,
+                backoff_factor=BACKOFF_BASE,
+                status_forcelist=RETRY_STATUSES,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+_UNSAFE_CHARS = re.compile(r"[^a-zA-Z0-9._-]+")
+
+
+def sanitize_filename(name: str) -> str:
+    safe = _UNSAFE_CHARS.sub("_", name)
+    return safe.strip("_") or "file"
+
+
+def url_key(parts: ParseResult) -> tuple[str, str, str]:
+    """Return the identity of a parsed link for deduplication.
+
+    Scheme, lower-cased host and path: the same document linked with a
+    fragment or a query-string decoration counts once, as it would be saved
+    to the same file.
+    """
+    return parts.scheme, parts.netloc.lower(), parts.path
+
+
+def has_content(path: Path) -> bool:
+    """Return True if path exists and is non-empty, with a single stat call."""
+    try:
+        return path.stat().st_size > 0
+    except OSError:
+        return False
+
+
+def _server_delay(resp: requests.Response) -> Optional[float]:
+    """Return the wait the server asked for via Retry-After or X-RateLimit-Reset."""
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    if resp.headers.get("X-RateLimit-Remaining") == "0":
+        try:
+            return max(0.0, float(resp.headers["X-RateLimit-Reset"]) - time.time())
+        except (KeyError, ValueError):
+            pass
+    return None
+
+
+def get_with_retry(
+    url: str,
+    *,
+    session: Optional[requests.Session] = None,
+    **kwargs,
+) -> requests.Response:
+    """GET url on the shared session, waiting out a short rate-limit window.
+
+    Connection errors and 429/5xx responses are already retried by the
+    session's adapter. This adds one more attempt when a 403/429 says the
+    rate limit resets (Retry-After / X-RateLimit-Reset) within BACKOFF_CAP.
+    Returns the final response, whatever its status.
+    """
+    get = (session or get_session()).get
+    resp = get(url, **kwargs)
+    if resp.status_code in (403, 429):
+        delay = _server_delay(resp)
+        if delay is not None and delay <= BACKOFF_CAP:
+            resp.close()
+            time.sleep(delay)
+            resp = get(url, **kwargs)
+    return resp
+
+
+def _remote_head(
+    session: requests.Session, url: str, headers: dict[str, str]
+) -> Optional[tuple[int, Optional[str]]]:
+    """HEAD url; return (body size, Last-Modified), or None if the size is unknown.
+
+    The size is the identity-encoded Content-Length of a 200 response; an
+    error, another status or an encoded body all return None.
+    """
+    try:
+        resp = session.head(url, headers=headers, allow_redirects=True, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException:
+        return None
+    if resp.status_code != 200:
+        return None
+    length = _identity_length(resp)
+    if length is None:
+        return None
+    return length, resp.headers.get("Last-Modified")
+
+
+def _unchanged_remote(remote: tuple[int, Optional[str]], dest: Path) -> bool:
+    """True if a _remote_head() result matches dest's size and is not newer.
+
+    A Last-Modified, if sent, must not be later than dest's mtime; an
+    unparseable one returns False.
+    """
+    length, last_modified = remote
+    st = dest.stat()
+    if length != st.st_size:
+        return False
+    if last_modified:
+        try:
+            if parsedate_to_datetime(last_modified).timestamp() > st.st_mtime:
+                return False
+        except (TypeError, ValueError):
+            return False
+    return True
+
+
+def _identity_length(resp: requests.Response) -> Optional[int]:
+    """Return resp's Content-Length if it is the size of the decoded body."""
+    length = resp.headers.get("Content-Length", "")
+    if length.isdigit() and not resp.headers.get("Content-Encoding"):
+        return int(length)
+    return None
+
+
+def _resume_headers(
+    resp: requests.Response, headers: Optional[dict[str, str]]
+) -> Optional[dict[str, str]]:
+    """Return headers for a Range request that continues resp, or None.
+
+    Resuming needs byte-range support, an unencoded body and a validator for
+    If-Range, so a file that changed in the meantime is re-sent whole
+    instead of being spliced onto the old bytes.
+    """
+    if resp.headers.get("Accept-Ranges") != "bytes" or resp.headers.get("Content-Encoding"):
+        return None
+    etag = resp.headers.get("ETag", "")
+    validator = etag if etag and not etag.startswith("W/") else resp.headers.get("Last-Modified")
+    if not validator:
+        return None
+    resumed = {
+        key: value
+        for key, value in (headers or {}).items()
+        if key not in ("If-None-Match", "If-Modified-Since")
+    }
+    resumed.update({"If-Range": validator, "Accept-Encoding": "identity"})
+    return resumed
+
+
+def stream_to(
+    resp: requests.Response,
+    dest: Path,
+    *,
+    session: Optional[requests.Session] = None,
+    headers: Optional[dict[str, str]] = None,
+    timeout: float = DOWNLOAD_TIMEOUT,
+) -> str:
+    """Stream resp's body to dest through a .part file; return its digest.
+
+    dest is only replaced once the body is complete, so an interrupted or
+    truncated transfer never leaves a partial file under the real name. The
+    body is read from the raw urllib3 stream in chunks of up to
+    DOWNLOAD_CHUNK_SIZE, and the HASH_ALGO digest is computed as chunks are
+    written, so the file is never re-read.
+
+    Given the *session* (and request *headers*) that produced resp, a body cut
+    off mid-transfer is resumed with a Range request, up to
+    REQUEST_RETRIES - 1 times, when the server supports it. Chunks are read
+    with read1(), which returns whatever has arrived instead of waiting for a
+    full chunk, so every byte received before the cut is kept and only the
+    rest is requested again. (On urllib3 builds without read1(), the partial
+    chunk in flight is lost and re-requested.)
+    Raises OSError on an empty body, a dropped connection or a Content-Length
+    mismatch.
+    """
+    part = dest.with_name(dest.name + ".part")
+    url = resp.url
+    resume_headers = _resume_headers(resp, headers) if session is not None else None
+    resumes = REQUEST_RETRIES - 1 if resume_headers is not None else 0
+    opened: list[requests.Response] = []
+    try:
+        with part.open("wb") as fh:
+            digest = new_hasher()
+            expected = _identity_length(resp)
+            while True:
+                # Let urllib3 undo any Content-Encoding, as iter_content() would.
+                resp.raw.decode_content = True
+                read = getattr(resp.raw, "read1", resp.raw.read)
+                try:
+                    for chunk in iter(lambda: read(DOWNLOAD_CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        fh.write(chunk)
+                    interrupted = None
+                except Urllib3HTTPError as exc:
+                    interrupted = exc
+                size = fh.tell()
+                if interrupted is None and (expected is None or size >= expected):
+                    break
+                if not resumes:
+                    if interrupted is not None:
+                        raise OSError(f"Transfer interrupted: {interrupted}") from interrupted
+                    break  # short body: reported by the length check below
+                resumes -= 1
+                resp = session.get(
+                    url,
+                    headers={**resume_headers, "Range": f"bytes={size}-"},
+                    timeout=timeout,
+                    stream=True,
+                )
+                opened.append(resp)
+                if resp.status_code == 206:
+                    if not resp.headers.get("Content-Range", "").startswith(f"bytes {size}-"):
+                        raise OSError("Resume failed: unexpected Content-Range")
+                elif resp.status_code == 200:
+                    # If-Range did not match: the file changed, start over.
+                    fh.seek(0)
+                    fh.truncate()
+                    digest = new_hasher()
+                    expected = _identity_length(resp)
+                else:
+                    raise OSError(f"Resume failed: HTTP {resp.status_code}")
+            size = fh.tell()
+        if size == 0:
+            raise OSError("Empty file after download")
+        if expected is not None and expected != size:
+            raise OSError(f"Incomplete download: {size} of {expected} bytes")
+        os.replace(part, dest)
+        return digest.hexdigest()
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    finally:
+        for extra in opened:
+            extra.close()
+
+
+def conditional_headers(state: "StateFile", dest: Path, url: str) -> Optional[dict[str, str]]:
+    """Return If-None-Match/If-Modified-Since headers to revalidate dest.
+
+    Returns None if dest is not a tracked, intact copy (a plain GET is
+    needed), or an empty dict if it is but no validators were recorded.
+    """
+    if not state.is_fresh(dest, url):
+        return None
+    etag, last_modified = state.validators(dest)
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+@contextmanager
+def _paced(url: str, limiter: Optional[HostLimiter]) -> Iterator[None]:
+    """Pace one request: through *limiter* if given, else the shared download bucket."""
+    if limiter is None:
+        _download_bucket.acquire()
+        yield
+    else:
+        with limiter.slot(url):
+            yield
+
+
+def download_file(
+    session: requests.Session,
+    url: str,
+    dest: Path,
+    *,
+    force: bool = False,
+    referer: Optional[str] = None,
+    state: Optional["StateFile"] = None,
+    timeout: float = DOWNLOAD_TIMEOUT,
+    headers: Optional[dict[str, str]] = None,
+    limiter: Optional[HostLimiter] = None,
+) -> tuple[bool, str]:
+    """Download url to dest. Returns (success, message).
+
+    Transient failures — connection errors and RETRY_STATUSES such as 429 —
+    are retried by the shared session's adapter with jittered exponential
+    backoff, honoring Retry-After.
+
+    *force* means "revalidate", not "re-download": local state is not
+    trusted, and a tracked file whose hash still matches is revalidated with
+    a conditional GET using the ETag/Last-Modified recorded in *state*; a
+    304 Not Modified keeps the local copy and reports "skipped". Files with no
+    recorded validators (e.g. adopted ones) get a HEAD preflight instead.
+    Untracked or damaged files, and any file when *state* is None, are
+    fetched in full. The CLI's "Re-check All With Servers" runs this path.
+    Without *state*, an existing file is kept unless a HEAD shows the remote
+    size differs (e.g. an earlier transfer was cut short).
+
+    *headers* are sent on every request, overriding the defaults. A *limiter*
+    paces the request per host and holds its slot for the whole transfer;
+    without one, downloads share the process-wide token bucket.
+    """
+    request_headers: dict[str, str] = {"User-Agent": USER_AGENT}
+    if referer:
+        request_headers["Referer"] = referer
+    if headers:
+        request_headers.update(headers)
+    headers = request_headers
+
+    # Without state, an existing copy is checked by a HEAD (inside the pacing
+    # below): it is kept unless the server reports a different size, e.g.
+    # because an earlier transfer was cut short.
+    check_size = False
+    if not force:
+        if state is not None:
+            if state.needs_adopt(dest):
+                state.adopt(dest, url)
+            if state.is_fresh(dest, url):
+                return True, "skipped"
+        else:
+            check_size = has_content(dest)
+
+    preflight = False
+    if force and state is not None:
+        validators = conditional_headers(state, dest, url)
+        if validators is not None:
+            headers.update(validators)
+            preflight = not validators
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+
+    with _paced(url, limiter):
+        if check_size:
+            remote = _remote_head(session, url, headers)
+            if remote is None or remote[0] == dest.stat().st_size:
+                return True, "skipped"
+        elif preflight:
+            remote = _remote_head(session, url, headers)
+            if remote is not None and _unchanged_remote(remote, dest):
+                return True, "skipped"
+
+        try:
+            with session.get(url, headers=headers, timeout=timeout, stream=True) as resp:
+                if resp.status_code == 304:
+                    return True, "skipped"
+                if resp.status_code == 200:
+                    digest = stream_to(
+                        resp, dest, session=session, headers=headers, timeout=timeout
+                    )
+                    if state is not None:
+                        state.record(
+                            dest,
+                            url,
+                            digest=digest,
+                            etag=resp.headers.get("ETag"),
+                            last_modified=resp.headers.get("Last-Modified"),
+                        )
+                    return True, "downloaded"
+                if resp.status_code == 404:
+                    return False, "not found (404)"
+                return False, f"HTTP {resp.status_code}"
+        except (requests.RequestException, OSError) as exc:
+            return False, f"failed: {exc}"
+
+
+def github_tree(
+    repo: str,
+    headers: dict[str, str],
+    cache_path: Path,
+    *,
+    save: bool = True,
+) -> Optional[list[str]]:
+    """Return every blob path in *repo* at HEAD from a single Git Trees API call.
+
+    The listing is cached in *cache_path* alongside its ETag so an unchanged
+    tree is revalidated with a 304 instead of re-sent. Returns None if GitHub
+    truncates the tree, in which case the caller must list directories itself.
+    Raises RuntimeError on API errors.
+    """
+    cached: Optional[dict] = None
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        pass
+    if not isinstance(cached, dict) or "etag" not in cached or "paths" not in cached:
+        cached = None
+
+    request_headers = dict(headers)
+    if cached is not None:
+        request_headers["If-None-Match"] = cached["etag"]
+
+    url = f"{GITHUB_API_BASE}/{repo}/git/trees/HEAD?recursive=1"
+    try:
+        resp = get_with_retry(url, headers=request_headers, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as exc:
+        raise RuntimeError(f"GitHub API request failed for {repo}: {exc}") from exc
+
+    if resp.status_code == 304 and cached is not None:
+        return cached["paths"]
+    if resp.status_code == 403:
+        raise RuntimeError(
+            f"GitHub API rate-limited ({repo}). "
+            "Set GITHUB_TOKEN env var to increase the unauthenticated limit."
+        )
+    if resp.status_code != 200:
+        raise RuntimeError(f"GitHub API returned {resp.status_code} for {repo}")
+
+    body = resp.json()
+    if body.get("truncated"):
+        return None
+    paths = [item["path"] for item in body["tree"] if item["type"] == "blob"]
+
+    etag = resp.headers.get("ETag")
+    if save and etag:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(cache_path, json.dumps({"etag": etag, "paths": paths}).encode("utf-8"))
+    return paths
+
+
+def require_playwright() -> None:
+    """Raise a clear error if Playwright is not installed."""
+    try:
+        import playwright  # noqa: F401
+    except ImportError as exc:
+        raise RuntimeError(
+            "Playwright is required but not installed.\n"
+            "Run: pip install playwright && playwright install chromium"
+        ) from exc
+
+
+class PlaywrightSession:
+    """Headless Chromium context shared by every browser fetch in one run.
+
+    The browser is launched on first use of .context, so runs where plain
+    requests succeed never import Playwright or pay the Chromium cold start.
+    """
+
+    def __init__(self) -> None:
+        self._playwright = None
+        self._browser = None
+        self._context = None
+
+    @property
+    def context(self):
+        if self._context is None:
+            require_playwright()
+            from playwright.sync_api import sync_playwright
+
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(
+                headless=True, args=["--no-sandbox"]
+            )
+            self._context = self._browser.new_context(user_agent=USER_AGENT)
+        return self._context
+
+    def close(self) -> None:
+        if self._browser is not None:
+            self._browser.close()
+        if self._playwright is not None:
+            self._playwright.stop()
+        self._playwright = self._browser = self._context = None
+
+
+@contextmanager
+def playwright_session() -> Iterator[PlaywrightSession]:
+    """Yield a lazily launched Playwright session, closing it on exit."""
+    session = PlaywrightSession()
+    try:
+        yield session
+    finally:
+        try:
+            session.close()
+        except Exception:  # noqa: BLE001
+            pass
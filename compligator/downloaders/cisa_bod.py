@@ -1,298 +1,350 @@
-"""CISA Binding Operational Directives (BOD) downloader.
-
-CISA BODs are published as HTML pages, not PDFs — the full directive text is
-embedded in each detail page at cisa.gov/news-events/directives/bod-*.
-
-Fetch strategy (index page, in order):
-1. Plain requests.get() — fast, works if CISA's WAF allows it
-2. Playwright headless browser — fallback if plain request is blocked
-3. Curated KNOWN_URLS list — last resort if the index itself cannot be scraped;
-   individual BOD pages are still publicly accessible even when the index is blocked
-"""
-
-from __future__ import annotations
-
-from pathlib import Path
-from typing import TYPE_CHECKING, Optional
-from urllib.parse import urljoin, urlparse
-
-import requests
-from bs4 import BeautifulSoup
-
-if TYPE_CHECKING:
-    from compligator.state import StateFile
-
-from .base import (
-    REQUEST_RETRIES,
-    REQUEST_TIMEOUT,
-    RETRY_DELAY,
-    USER_AGENT,
-    DownloadResult,
-    download_file,
-    require_playwright,
-    sanitize_filename,
-)
-
-SOURCE_URL = "https://www.cisa.gov/directives"
-BASE_URL = "https://www.cisa.gov"
-
-# URL path prefix that all BOD detail pages share
-BOD_PATH_PREFIX = "/news-events/directives/bod-"
-
-# ---------------------------------------------------------------------------
-# Curated fallback URL list
-# ---------------------------------------------------------------------------
-
-# Date these URLs were last manually verified against SOURCE_URL.
-KNOWN_URLS_VERIFIED = "2026-02-26"
-
-# Direct BOD detail page URLs. Used when the index page cannot be scraped.
-KNOWN_URLS: list[str] = [
-    "https://www.cisa.gov/news-events/directives/bod-26-02-mitigating-risk-end-support-edge-devices",
-    "https://www.cisa.gov/news-events/directives/bod-25-01-implementing-secure-practices-cloud-services",
-    "https://www.cisa.gov/news-events/directives/bod-25-01-implementation-guidance-implementing-secure-practices-cloud-services",
-    "https://www.cisa.gov/news-events/directives/binding-operational-directive-23-02",
-    "https://www.cisa.gov/news-events/directives/bod-23-02-implementation-guidance-mitigating-risk-internet-exposed-management-interfaces",
-    "https://www.cisa.gov/news-events/directives/bod-23-01-improving-asset-visibility-and-vulnerability-detection-federal-networks",
-    "https://www.cisa.gov/news-events/directives/bod-23-01-implementation-guidance-improving-asset-visibility-and-vulnerability-detection-federal",
-    "https://www.cisa.gov/news-events/directives/bod-22-01-reducing-significant-risk-known-exploited-vulnerabilities",
-    "https://www.cisa.gov/news-events/directives/bod-20-01-develop-and-publish-vulnerability-disclosure-policy",
-    "https://www.cisa.gov/news-events/directives/bod-19-02-vulnerability-remediation-requirements-internet-accessible-systems",
-    "https://www.cisa.gov/news-events/directives/bod-18-02-securing-high-value-assets",
-    "https://www.cisa.gov/news-events/directives/bod-18-01-enhance-email-and-web-security",
-    "https://www.cisa.gov/news-events/directives/bod-17-01-removal-kaspersky-branded-products",
-    "https://www.cisa.gov/news-events/directives/bod-16-03-2016-agency-cybersecurity-reporting-requirements",
-    "https://www.cisa.gov/news-events/directives/bod-16-02-threat-network-infrastructure-devices",
-    "https://www.cisa.gov/news-events/directives/binding-operational-directive-16-01",
-    "https://www.cisa.gov/news-events/directives/binding-operational-directive-15-01",
-]
-
-# ---------------------------------------------------------------------------
-# Index page fetching
-# ---------------------------------------------------------------------------
-
-
-def _fetch_html_plain() -> Optional[str]:
-    """Fetch the index page via plain requests. Returns HTML or None."""
-    import time
-
-    headers = {"User-Agent": USER_AGENT}
-    for attempt in range(REQUEST_RETRIES):
-        try:
-            resp = requests.get(SOURCE_URL, headers=headers, timeout=REQUEST_TIMEOUT)
-            if resp.status_code == 200:
-                return resp.text
-        except requests.RequestException:
-            pass
-        if attempt < REQUEST_RETRIES - 1:
-            time.sleep(RETRY_DELAY)
-    return None
-
-
-def _fetch_html_playwright() -> Optional[str]:
-    """Fetch the index page via Playwright headless browser. Returns HTML or None."""
-    try:
-        require_playwright()
-        from playwright.sync_api import sync_playwright
-
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True, args=["--no-sandbox"])
-            page = browser.new_page(user_agent=USER_AGENT)
-            page.goto(SOURCE_URL, wait_until="networkidle")
-            html = page.content()
-            browser.close()
-        return html
-    except Exception:  # noqa: BLE001
-        return None
-
-
-def _parse_bod_links(html: str) -> list[tuple[str, str]]:
-    """Return list of (filename, full_url) for all BOD detail pages on the index."""
-    soup = BeautifulSoup(html, "html.parser")
-    seen: set[str] = set()
-    links: list[tuple[str, str]] = []
-
-    for anchor in soup.find_all("a", href=True):
-        href = anchor["href"].strip()
-        if not href:
-            continue
-        full_url = urljoin(BASE_URL, href)
-        path = urlparse(full_url).path
-        if not path.startswith(BOD_PATH_PREFIX):
-            continue
-        if full_url in seen:
-            continue
-        seen.add(full_url)
-        slug = Path(path).name
-        filename = sanitize_filename(slug) + ".html"
-        links.append((filename, full_url))
-
-    return links
-
-
-def _links_from_known_urls() -> list[tuple[str, str]]:
-    """Convert KNOWN_URLS to (filename, url) format."""
-    links = []
-    for url in KNOWN_URLS:
-        slug = Path(urlparse(url).path).name
-        filename = sanitize_filename(slug) + ".html"
-        links.append((filename, url))
-    return links
-
-
-def _write_known_urls_file(dest: Path) -> None:
-    """Write a plain-text list of KNOWN_URLS to dest/_known-urls.txt."""
-    lines = [
-        f"# CISA BOD known fallback URLs — last verified {KNOWN_URLS_VERIFIED}",
-        "# Used when the CISA WAF blocks automated scraping of the directives index.",
-        f"# Source page: {SOURCE_URL}",
-        "",
-    ]
-    for url in KNOWN_URLS:
-        lines.append(url)
-    (dest / "_known-urls.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
-
-
-def _try_scrape() -> Optional[list[tuple[str, str]]]:
-    """Try plain requests then Playwright to scrape the index. Returns links or None."""
-    html = _fetch_html_plain()
-    if html:
-        links = _parse_bod_links(html)
-        if links:
-            return links
-
-    html = _fetch_html_playwright()
-    if html:
-        links = _parse_bod_links(html)
-        if links:
-            return links
-
-    return None
-
-
-# ---------------------------------------------------------------------------
-# Page downloading (requests → Playwright fallback)
-# ---------------------------------------------------------------------------
-
-
-def _playwright_download_pages(
-    links: list[tuple[str, str]],
-    dest: Path,
-    force: bool,
-    state: Optional["StateFile"],
-) -> tuple[list[str], list[str], list[tuple[str, str]]]:
-    """Fetch BOD HTML pages via Playwright. Returns (downloaded, skipped, errors)."""
-    downloaded: list[str] = []
-    skipped: list[str] = []
-    errors: list[tuple[str, str]] = []
-
-    try:
-        require_playwright()
-        from playwright.sync_api import sync_playwright
-
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True, args=["--no-sandbox"])
-            pg = browser.new_page(user_agent=USER_AGENT)
-            for filename, url in links:
-                target = dest / filename
-                if not force and target.exists() and target.stat().st_size > 0:
-                    skipped.append(filename)
-                    continue
-                try:
-                    pg.goto(url, wait_until="networkidle", timeout=30000)
-                    html = pg.content()
-                    target.write_text(html, encoding="utf-8")
-                    if state is not None:
-                        state.record(target, url)
-                    downloaded.append(filename)
-                except Exception as exc:  # noqa: BLE001
-                    errors.append((filename, f"playwright: {exc}"))
-            browser.close()
-    except Exception:  # noqa: BLE001
-        hint = "WAF blocked; install Playwright browser to enable auto-download"
-        for filename, _url in links:
-            errors.append((filename, hint))
-
-    return downloaded, skipped, errors
-
-
-def _download_pages(
-    links: list[tuple[str, str]],
-    dest: Path,
-    force: bool,
-    state: Optional["StateFile"] = None,
-) -> DownloadResult:
-    """Download BOD HTML pages: plain requests first, Playwright fallback for failures."""
-    result = DownloadResult(framework="cisa-bod")
-    session = requests.Session()
-    needs_playwright: list[tuple[str, str]] = []
-
-    for filename, url in links:
-        target = dest / filename
-        ok, msg = download_file(session, url, target, force=force, referer=SOURCE_URL, state=state)
-        if msg == "skipped":
-            result.skipped.append(filename)
-        elif ok:
-            result.downloaded.append(filename)
-        else:
-            needs_playwright.append((filename, url))
-
-    if needs_playwright:
-        pw_dl, pw_sk, pw_err = _playwright_download_pages(needs_playwright, dest, force, state)
-        result.downloaded.extend(pw_dl)
-        result.skipped.extend(pw_sk)
-        result.errors.extend(pw_err)
-
-    return result
-
-
-# ---------------------------------------------------------------------------
-# Entry point
-# ---------------------------------------------------------------------------
-
-
-def run(
-    output_dir: Path,
-    dry_run: bool = False,
-    force: bool = False,
-    state: Optional["StateFile"] = None,
-) -> DownloadResult:
-    dest = output_dir / "cisa-bod"
-
-    links = _try_scrape()
-    used_known_urls = links is None
-    if links is None:
-        links = _links_from_known_urls()
-
-    if not links:
-        result = DownloadResult(framework="cisa-bod")
-        result.errors.append(("", f"Failed to fetch CISA directives index: {SOURCE_URL}"))
-        return result
-
-    if dry_run:
-        result = DownloadResult(framework="cisa-bod")
-        for filename, _url in links:
-            target = dest / filename
-            if not force and target.exists() and target.stat().st_size > 0:
-                result.skipped.append(filename)
-            else:
-                result.downloaded.append(filename)
-        if used_known_urls:
-            result.notices.append(
-                f"Automated index scrape unavailable — CISA WAF blocked access. "
-                f"Used last-known-good URL list (last verified {KNOWN_URLS_VERIFIED}). "
-                f"See source-content/cisa-bod/_known-urls.txt for the full URL list."
-            )
-        return result
-
-    dest.mkdir(parents=True, exist_ok=True)
-    _write_known_urls_file(dest)
-    result = _download_pages(links, dest, force, state)
-    if used_known_urls:
-        result.notices.append(
-            f"Automated index scrape unavailable — CISA WAF blocked access. "
-            f"Used last-known-good URL list (last verified {KNOWN_URLS_VERIFIED}). "
-            f"See source-content/cisa-bod/_known-urls.txt for the full URL list."
-        )
-
-    return result
+"""CISA Binding Operational Directives (BOD) downloader.
+
+CISA BODs are published as HTML pages, not PDFs — the full directive text is
+embedded in each detail page at cisa.gov/news-events/directives/bod-*.
+
+Fetch strategy (index page, in order):
+1. Plain requests.get() — fast, works if CISA's WAF allows it
+2. Playwright headless browser — fallback if plain request is blocked
+3. Curated KNOWN_URLS list — last resort if the index itself cannot be scraped;
+   individual BOD pages are still publicly accessible even when the index is blocked
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+if TYPE_CHECKING:
+    from compligator.state import StateFile
+
+from .base import (
+    HTML_PARSER,
+    REQUEST_TIMEOUT,
+    USER_AGENT,
+    DownloadResult,
+    PlaywrightSession,
+    download_file,
+    get_session,
+    get_with_retry,
+    has_content,
+    playwright_session,
+    sanitize_filename,
+    url_key,
+    write_atomic,
+)
+
+SOURCE_URL = "https://www.cisa.gov/directives"
+BASE_URL = "https://www.cisa.gov"
+
+# URL path prefix that all BOD detail pages share
+BOD_PATH_PREFIX = "/news-events/directives/bod-"
+
+DOWNLOAD_WORKERS = 4
+
+# Index fetch method that last worked ("plain" or "playwright"), remembered so
+# WAF-blocked environments stop paying for plain attempts on every run.
+FETCH_MODE_FILE = ".fetch-mode"
+FETCH_MODE_TTL = 24 * 60 * 60
+
+# ---------------------------------------------------------------------------
+# Curated fallback URL list
+# ---------------------------------------------------------------------------
+
+# Date these URLs were last manually verified against SOURCE_URL.
+KNOWN_URLS_VERIFIED = "2026-02-26"
+
+# Direct BOD detail page URLs. Used when the index page cannot be scraped.
+KNOWN_URLS: list[str] = [
+    "https://www.cisa.gov/news-events/directives/bod-26-02-mitigating-risk-end-support-edge-devices",
+    "https://www.cisa.gov/news-events/directives/bod-25-01-implementing-secure-practices-cloud-services",
+    "https://www.cisa.gov/news-events/directives/bod-25-01-implementation-guidance-implementing-secure-practices-cloud-services",
+    "https://www.cisa.gov/news-events/directives/binding-operational-directive-23-02",
+    "https://www.cisa.gov/news-events/directives/bod-23-02-implementation-guidance-mitigating-risk-internet-exposed-management-interfaces",
+    "https://www.cisa.gov/news-events/directives/bod-23-01-improving-asset-visibility-and-vulnerability-detection-federal-networks",
+    "https://www.cisa.gov/news-events/directives/bod-23-01-implementation-guidance-improving-asset-visibility-and-vulnerability-detection-federal",
+    "https://www.cisa.gov/news-events/directives/bod-22-01-reducing-significant-risk-known-exploited-vulnerabilities",
+    "https://www.cisa.gov/news-events/directives/bod-20-01-develop-and-publish-vulnerability-disclosure-policy",
+    "https://www.cisa.gov/news-events/directives/bod-19-02-vulnerability-remediation-requirements-internet-accessible-systems",
+    "https://www.cisa.gov/news-events/directives/bod-18-02-securing-high-value-assets",
+    "https://www.cisa.gov/news-events/directives/bod-18-01-enhance-email-and-web-security",
+    "https://www.cisa.gov/news-events/directives/bod-17-01-removal-kaspersky-branded-products",
+    "https://www.cisa.gov/news-events/directives/bod-16-03-2016-agency-cybersecurity-reporting-requirements",
+    "https://www.cisa.gov/news-events/directives/bod-16-02-threat-network-infrastructure-devices",
+    "https://www.cisa.gov/news-events/directives/binding-operational-directive-16-01",
+    "https://www.cisa.gov/news-events/directives/binding-operational-directive-15-01",
+]
+
+# ---------------------------------------------------------------------------
+# Index page fetching
+# ---------------------------------------------------------------------------
+
+
+def _fetch_html_plain() -> Optional[str]:
+    """Fetch the index page via plain requests. Returns HTML or None."""
+    headers = {"User-Agent": USER_AGENT}
+    try:
+        resp = get_with_retry(SOURCE_URL, headers=headers, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException:
+        return None
+    return resp.text if resp.status_code == 200 else None
+
+
+def _fetch_html_playwright(pw: PlaywrightSession) -> Optional[str]:
+    """Fetch the index page via Playwright headless browser. Returns HTML or None."""
+    try:
+        page = pw.context.new_page()
+        try:
+            page.goto(SOURCE_URL, wait_until="networkidle")
+            return page.content()
+        finally:
+            page.close()
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def _parse_bod_links(html: str) -> list[tuple[str, str]]:
+    """Return list of (filename, full_url) for all BOD detail pages on the index."""
+    # Only anchors are needed, so skip building the rest of the document tree.
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=SoupStrainer("a", href=True))
+    # Keyed by url_key(): dedupes nav/footer repeats and fragment/query
+    # variants of the same page while keeping first-seen order.
+    links: dict[tuple[str, str, str], tuple[str, str]] = {}
+
+    for anchor in soup.find_all("a"):
+        href = anchor["href"].strip()
+        if not href:
+            continue
+        full_url = urljoin(BASE_URL, href)
+        parts = urlparse(full_url)
+        key = url_key(parts)
+        if key in links or not parts.path.startswith(BOD_PATH_PREFIX):
+            continue
+        slug = Path(parts.path).name
+        filename = sanitize_filename(slug) + ".html"
+        links[key] = (filename, full_url)
+
+    return list(links.values())
+
+
+def _links_from_known_urls() -> list[tuple[str, str]]:
+    """Convert KNOWN_URLS to (filename, url) format."""
+    links = []
+    for url in KNOWN_URLS:
+        slug = Path(urlparse(url).path).name
+        filename = sanitize_filename(slug) + ".html"
+        links.append((filename, url))
+    return links
+
+
+def _write_known_urls_file(dest: Path) -> None:
+    """Write a plain-text list of KNOWN_URLS to dest/_known-urls.txt."""
+    lines = [
+        f"# CISA BOD known fallback URLs — last verified {KNOWN_URLS_VERIFIED}",
+        "# Used when the CISA WAF blocks automated scraping of the directives index.",
+        f"# Source page: {SOURCE_URL}",
+        "",
+    ]
+    lines.extend(KNOWN_URLS)
+    write_atomic(dest / "_known-urls.txt", ("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def _cached_fetch_mode(dest: Path) -> Optional[str]:
+    """Return the fetch mode recorded in dest within FETCH_MODE_TTL, if any."""
+    path = dest / FETCH_MODE_FILE
+    try:
+        if time.time() - path.stat().st_mtime > FETCH_MODE_TTL:
+            return None
+        mode = path.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return mode if mode in ("plain", "playwright") else None
+
+
+def _try_scrape(
+    pw: PlaywrightSession, dest: Path, save: bool
+) -> Optional[list[tuple[str, str]]]:
+    """Try plain requests then Playwright to scrape the index. Returns links or None.
+
+    A cached "playwright" mode tries the browser first, skipping the plain
+    request the WAF is known to block. The mode that succeeds is written back
+    when it differs from (or has outlived) the cached one.
+    """
+    mode = _cached_fetch_mode(dest)
+    fetchers = [
+        ("plain", _fetch_html_plain),
+        ("playwright", lambda: _fetch_html_playwright(pw)),
+    ]
+    if mode == "playwright":
+        fetchers.reverse()
+
+    for name, fetch in fetchers:
+        html = fetch()
+        if not html:
+            continue
+        links = _parse_bod_links(html)
+        if links:
+            if save and name != mode:
+                dest.mkdir(parents=True, exist_ok=True)
+                write_atomic(dest / FETCH_MODE_FILE, (name + "\n").encode("utf-8"))
+            return links
+
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Page downloading (requests → Playwright fallback)
+# ---------------------------------------------------------------------------
+
+
+def _playwright_download_pages(
+    links: list[tuple[str, str]],
+    dest: Path,
+    force: bool,
+    state: Optional["StateFile"],
+    pw: PlaywrightSession,
+) -> tuple[list[str], list[str], list[tuple[str, str]]]:
+    """Fetch BOD HTML pages via Playwright. Returns (downloaded, skipped, errors)."""
+    downloaded: list[str] = []
+    skipped: list[str] = []
+    errors: list[tuple[str, str]] = []
+
+    try:
+        context = pw.context
+    except Exception:  # noqa: BLE001
+        hint = "WAF blocked; install Playwright browser to enable auto-download"
+        for filename, _url in links:
+            errors.append((filename, hint))
+        return downloaded, skipped, errors
+
+    for filename, url in links:
+        target = dest / filename
+        if not force and has_content(target):
+            skipped.append(filename)
+            continue
+        try:
+            page = context.new_page()
+            try:
+                # Detail pages are static HTML; waiting for network idle only
+                # stalls on analytics beacons.
+                page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                html = page.content()
+            finally:
+                page.close()
+            write_atomic(target, html.encode("utf-8"))
+            if state is not None:
+                state.record(target, url)
+            downloaded.append(filename)
+        except Exception as exc:  # noqa: BLE001
+            errors.append((filename, f"playwright: {exc}"))
+
+    return downloaded, skipped, errors
+
+
+def _download_pages(
+    links: list[tuple[str, str]],
+    dest: Path,
+    force: bool,
+    state: Optional["StateFile"],
+    pw: PlaywrightSession,
+) -> DownloadResult:
+    """Download BOD HTML pages: plain requests first, Playwright fallback for failures."""
+    result = DownloadResult(framework="cisa-bod")
+    session = get_session()
+    if state is not None and not force:
+        state.adopt_many((dest / filename, url) for filename, url in links)
+    needs_playwright: list[tuple[str, str]] = []
+
+    def _download(item: tuple[str, str]) -> tuple[str, str, bool, str]:
+        filename, url = item
+        target = dest / filename
+        ok, msg = download_file(session, url, target, force=force, referer=SOURCE_URL, state=state)
+        return filename, url, ok, msg
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        for filename, url, ok, msg in executor.map(_download, links):
+            if msg == "skipped":
+                result.skipped.append(filename)
+            elif ok:
+                result.downloaded.append(filename)
+            else:
+                needs_playwright.append((filename, url))
+
+    if needs_playwright:
+        pw_dl, pw_sk, pw_err = _playwright_download_pages(
+            needs_playwright, dest, force, state, pw
+        )
+        result.downloaded.extend(pw_dl)
+        result.skipped.extend(pw_sk)
+        result.errors.extend(pw_err)
+
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+
+def run(
+    output_dir: Path,
+    dry_run: bool = False,
+    force: bool = False,
+    state: Optional["StateFile"] = None,
+) -> DownloadResult:
+    dest = output_dir / "cisa-bod"
+
+    with playwright_session() as pw:
+        return _run(dest, dry_run, force, state, pw)
+
+
+def _run(
+    dest: Path,
+    dry_run: bool,
+    force: bool,
+    state: Optional["StateFile"],
+    pw: PlaywrightSession,
+) -> DownloadResult:
+    links = _try_scrape(pw, dest, save=not dry_run)
+    used_known_urls = links is None
+    if links is None:
+        links = _links_from_known_urls()
+
+    if not links:
+        result = DownloadResult(framework="cisa-bod")
+        result.errors.append(("", f"Failed to fetch CISA directives index: {SOURCE_URL}"))
+        return result
+
+    if dry_run:
+        result = DownloadResult(framework="cisa-bod")
+        for filename, _url in links:
+            target = dest / filename
+            if not force and has_content(target):
+                result.skipped.append(filename)
+            else:
+                result.downloaded.append(filename)
+        if used_known_urls:
+            result.notices.append(
+                f"Automated index scrape unavailable — CISA WAF blocked access. "
+                f"Used last-known-good URL list (last verified {KNOWN_URLS_VERIFIED}). "
+                f"See source-content/cisa-bod/_known-urls.txt for the full URL list."
+            )
+        return result
+
+    dest.mkdir(parents=True, exist_ok=True)
+    _write_known_urls_file(dest)
+    result = _download_pages(links, dest, force, state, pw)
+    if used_known_urls:
+        result.notices.append(
+            f"Automated index scrape unavailable — CISA WAF blocked access. "
+            f"Used last-known-good URL list (last verified {KNOWN_URLS_VERIFIED}). "
+            f"See source-content/cisa-bod/_known-urls.txt for the full URL list."
+        )
+
+    return result
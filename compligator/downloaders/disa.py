@@ -1,138 +1,161 @@
-"""DISA STIGs library downloader — probes for the current monthly ZIP."""
-
-from __future__ import annotations
-
-import calendar
-import re
-import time
-from pathlib import Path
-from typing import TYPE_CHECKING, Optional
-from urllib.parse import urlparse
-
-import requests
-
-if TYPE_CHECKING:
-    from compligator.state import StateFile
-
-from .base import (
-    REQUEST_RETRIES,
-    REQUEST_TIMEOUT,
-    RETRY_DELAY,
-    USER_AGENT,
-    DownloadResult,
-    sanitize_filename,
-)
-
-LIBRARY_BASE = "https://dl.dod.cyber.mil/wp-content/uploads/stigs/zip/"
-REFERER = "https://www.cyber.mil/stigs/downloads"
-PROBE_MONTHS_BACK = 24
-
-
-def _probe_url() -> str | None:
-    """Probe recent month/year combinations to find the current library ZIP."""
-    session = requests.Session()
-    headers = {"User-Agent": USER_AGENT}
-    now = time.gmtime()
-    year, month = now.tm_year, now.tm_mon
-
-    for _ in range(PROBE_MONTHS_BACK):
-        month_name = calendar.month_name[month]
-        candidate = f"{LIBRARY_BASE}U_SRG-STIG_Library_{month_name}_{year}.zip"
-        try:
-            resp = session.head(
-                candidate, headers=headers, timeout=REQUEST_TIMEOUT, allow_redirects=True
-            )
-            if resp.status_code == 200:
-                return candidate
-        except requests.RequestException:
-            pass
-        month -= 1
-        if month == 0:
-            month = 12
-            year -= 1
-
-    return None
-
-
-def _download_zip(
-    url: str,
-    dest: Path,
-    force: bool,
-    state: Optional["StateFile"] = None,
-) -> tuple[bool, str]:
-    """Stream-download the STIG library ZIP to dest."""
-    if not force:
-        if state is not None:
-            if state.needs_adopt(dest):
-                state.adopt(dest, url)
-            if state.is_fresh(dest, url):
-                return True, "skipped"
-        elif dest.exists() and dest.stat().st_size > 0:
-            return True, "skipped"
-
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    session = requests.Session()
-    headers = {"User-Agent": USER_AGENT, "Referer": REFERER}
-
-    for attempt in range(REQUEST_RETRIES):
-        try:
-            with session.get(url, headers=headers, timeout=300, stream=True) as resp:
-                if resp.status_code == 200:
-                    with dest.open("wb") as fh:
-                        for chunk in resp.iter_content(chunk_size=65536):
-                            if chunk:
-                                fh.write(chunk)
-                    if dest.stat().st_size == 0:
-                        dest.unlink(missing_ok=True)
-                        raise OSError("Empty file after download")
-                    if state is not None:
-                        state.record(dest, url)
-                    return True, "downloaded"
-                if resp.status_code == 404:
-                    return False, "not found (404)"
-        except requests.RequestException as exc:
-            if attempt < REQUEST_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
-            else:
-                return False, f"failed: {exc}"
-
-    return False, "failed after retries"
-
-
-def run(
-    output_dir: Path,
-    dry_run: bool = False,
-    force: bool = False,
-    state: Optional["StateFile"] = None,
-) -> DownloadResult:
-    result = DownloadResult(framework="disa")
-    dest = output_dir / "disa-stigs"
-
-    url = _probe_url()
-    if not url:
-        result.errors.append((
-            "U_SRG-STIG_Library.zip",
-            f"Archive not found within {PROBE_MONTHS_BACK} months — "
-            "check LIBRARY_BASE URL or probe window in disa.py",
-        ))
-        return result
-
-    filename = sanitize_filename(re.sub(r"[^a-zA-Z0-9._-]", "_", urlparse(url).path.split("/")[-1]))
-    target = dest / filename
-
-    if dry_run:
-        if not force and target.exists() and target.stat().st_size > 0:
-            result.skipped.append(filename)
-        else:
-            result.downloaded.append(filename)
-        return result
-
-    ok, msg = _download_zip(url, target, force, state)
-    if msg == "skipped":
-        result.skipped.append(filename)
-    elif ok:
-        result.downloaded.append(filename)
-    else:
-        result.errors.append((filename, msg))
-
-    return result
+"""DISA STIGs library downloader — probes for the current monthly ZIP."""
+
+from __future__ import annotations
+
+import calendar
+import concurrent.futures
+import json
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlparse
+
+import requests
+
+if TYPE_CHECKING:
+    from compligator.state import StateFile
+
+from .base import (
+    REQUEST_TIMEOUT,
+    DownloadResult,
+    download_file,
+    get_session,
+    has_content,
+    sanitize_filename,
+    write_atomic,
+)
+
+LIBRARY_BASE = "https://dl.dod.cyber.mil/wp-content/uploads/stigs/zip/"
+REFERER = "https://www.cyber.mil/stigs/downloads"
+PROBE_MONTHS_BACK = 24
+PROBE_WORKERS = 8
+# The library archive is large; allow it longer than base.DOWNLOAD_TIMEOUT.
+ARCHIVE_TIMEOUT = 300
+# The URL found by the probe is remembered here for PROBE_CACHE_TTL seconds,
+# so daily re-runs confirm it with one HEAD instead of probing every month.
+# Set COMPLIGATOR_NO_PROBE_CACHE (or sync with force) to always probe.
+PROBE_CACHE = ".probe-cache.json"
+PROBE_CACHE_TTL = 24 * 60 * 60
+NO_PROBE_CACHE_ENV = "COMPLIGATOR_NO_PROBE_CACHE"
+
+
+def _candidate_urls() -> list[str]:
+    """Return the library ZIP URL for each of the last PROBE_MONTHS_BACK months, newest first."""
+    now = time.gmtime()
+    year, month = now.tm_year, now.tm_mon
+    urls = []
+    for _ in range(PROBE_MONTHS_BACK):
+        month_name = calendar.month_name[month]
+        urls.append(f"{LIBRARY_BASE}U_SRG-STIG_Library_{month_name}_{year}.zip")
+        month -= 1
+        if month == 0:
+            month = 12
+            year -= 1
+    return urls
+
+
+def _exists(session: requests.Session, url: str) -> bool:
+    try:
+        resp = session.head(url, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+    except requests.RequestException:
+        return False
+    return resp.status_code == 200
+
+
+def _probe_url(session: requests.Session) -> str | None:
+    """Probe recent month/year combinations to find the current library ZIP.
+
+    The HEAD probes run PROBE_WORKERS at a time over the shared keep-alive
+    session. Results are read newest month first, so the newest archive that
+    exists wins; probes for older months that have not started are cancelled.
+    """
+    candidates = _candidate_urls()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=PROBE_WORKERS) as executor:
+        futures = [executor.submit(_exists, session, url) for url in candidates]
+        found = None
+        for url, future in zip(candidates, futures):
+            if future.result():
+                found = url
+                break
+        for future in futures:
+            future.cancel()
+    return found
+
+
+def _cached_url(session: requests.Session, cache_path: Path) -> Optional[str]:
+    """Return the cached library URL if it is within its TTL and still exists."""
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        url, ts = cached["url"], float(cached["ts"])
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+    if not 0 <= time.time() - ts < PROBE_CACHE_TTL:
+        return None
+    return url if _exists(session, url) else None
+
+
+def _find_url(
+    session: requests.Session, cache_path: Path, *, use_cache: bool, save: bool
+) -> Optional[str]:
+    """Return the library URL from the probe cache, falling back to a full probe."""
+    if use_cache:
+        url = _cached_url(session, cache_path)
+        if url:
+            return url
+    url = _probe_url(session)
+    if url and save:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(cache_path, json.dumps({"url": url, "ts": time.time()}).encode("utf-8"))
+    return url
+
+
+def run(
+    output_dir: Path,
+    dry_run: bool = False,
+    force: bool = False,
+    state: Optional["StateFile"] = None,
+) -> DownloadResult:
+    result = DownloadResult(framework="disa")
+    dest = output_dir / "disa-stigs"
+
+    # One session for the probe and the download, so the archive GET reuses
+    # the keep-alive connection the HEAD probes opened to the same host.
+    session = get_session()
+    use_cache = not force and not os.environ.get(NO_PROBE_CACHE_ENV)
+    url = _find_url(session, dest / PROBE_CACHE, use_cache=use_cache, save=not dry_run)
+    if not url:
+        result.errors.append((
+            "U_SRG-STIG_Library.zip",
+            f"Archive not found within {PROBE_MONTHS_BACK} months — "
+            "check LIBRARY_BASE URL or probe window in disa.py",
+        ))
+        return result
+
+    filename = sanitize_filename(urlparse(url).path.split("/")[-1])
+    target = dest / filename
+
+    if dry_run:
+        if not force and has_content(target):
+            result.skipped.append(filename)
+        else:
+            result.downloaded.append(filename)
+        return result
+
+    ok, msg = download_file(
+        session,
+        url,
+        target,
+        force=force,
+        referer=REFERER,
+        state=state,
+        timeout=ARCHIVE_TIMEOUT,
+    )
+    if msg == "skipped":
+        result.skipped.append(filename)
+    elif ok:
+        result.downloaded.append(filename)
+    else:
+        result.errors.append((filename, msg))
+
+    return result
@@ -1,140 +1,211 @@
-"""FedRAMP automation artifacts downloader.
-
-Downloads Rev 5 OSCAL content and guide documents from the GSA/fedramp-automation
-GitHub repository:
-
-  baselines/   — OSCAL profiles and resolved catalogs (HIGH/MODERATE/LOW/LI-SaaS)
-  resources/   — FedRAMP extensions, threats, values, and information types
-  templates/   — OSCAL templates (SSP, SAP, SAR, POAM)
-  guides/      — OSCAL implementation guide PDFs
-
-The GitHub API is used to discover file listings; actual downloads come from
-raw.githubusercontent.com. Set the GITHUB_TOKEN environment variable to raise
-the unauthenticated API rate limit from 60 to 5,000 requests/hour if needed.
-"""
-
-from __future__ import annotations
-
-import os
-from pathlib import Path
-from typing import TYPE_CHECKING, Optional
-
-import requests
-
-if TYPE_CHECKING:
-    from compligator.state import StateFile
-
-from .base import (
-    REQUEST_TIMEOUT,
-    USER_AGENT,
-    DownloadResult,
-    download_file,
-)
-
-SOURCE_URL = "https://github.com/GSA/fedramp-automation"
-REPO_API_BASE = "https://api.github.com/repos/GSA/fedramp-automation/contents"
-
-# (GitHub API path, local subdir under dest, file extensions to include)
-CONTENT_SETS: list[tuple[str, str, set[str]]] = [
-    ("dist/content/rev5/baselines/json",    "baselines",  {".json"}),
-    ("dist/content/rev5/resources/json",    "resources",  {".json"}),
-    ("dist/content/rev5/templates/ssp/json", "templates", {".json"}),
-    ("dist/content/rev5/templates/sap/json", "templates", {".json"}),
-    ("dist/content/rev5/templates/sar/json", "templates", {".json"}),
-    ("dist/content/rev5/templates/poam/json", "templates", {".json"}),
-    ("documents/rev5",                      "guides",     {".pdf"}),
-]
-
-
-# ---------------------------------------------------------------------------
-# GitHub API helpers
-# ---------------------------------------------------------------------------
-
-
-def _api_headers() -> dict[str, str]:
-    """Build request headers, including a GitHub token if set in the environment."""
-    headers = {"User-Agent": USER_AGENT, "Accept": "application/vnd.github+json"}
-    token = os.environ.get("GITHUB_TOKEN")
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    return headers
-
-
-def _list_files(api_path: str, include_ext: set[str]) -> list[tuple[str, str]]:
-    """Return (filename, download_url) for matching files in a repo directory.
-
-    Skips minified JSON variants (*-min.json) and subdirectories.
-    Raises RuntimeError on API errors.
-    """
-    url = f"{REPO_API_BASE}/{api_path}"
-    try:
-        resp = requests.get(url, headers=_api_headers(), timeout=REQUEST_TIMEOUT)
-    except requests.RequestException as exc:
-        raise RuntimeError(f"GitHub API request failed for {api_path}: {exc}") from exc
-
-    if resp.status_code == 403:
-        raise RuntimeError(
-            f"GitHub API rate-limited ({api_path}). "
-            "Set GITHUB_TOKEN env var to increase the unauthenticated limit."
-        )
-    if resp.status_code != 200:
-        raise RuntimeError(f"GitHub API returned {resp.status_code} for {api_path}")
-
-    return [
-        (item["name"], item["download_url"])
-        for item in resp.json()
-        if item["type"] == "file"
-        and Path(item["name"]).suffix.lower() in include_ext
-        and not item["name"].endswith("-min.json")
-    ]
-
-
-# ---------------------------------------------------------------------------
-# Entry point
-# ---------------------------------------------------------------------------
-
-
-def run(
-    output_dir: Path,
-    dry_run: bool = False,
-    force: bool = False,
-    state: Optional["StateFile"] = None,
-) -> DownloadResult:
-    dest = output_dir / "fedramp-github"
-    result = DownloadResult(framework="fedramp-github")
-
-    # Discover all files via GitHub API
-    all_links: list[tuple[str, str, str]] = []  # (filename, url, subdir)
-    for api_path, subdir, include_ext in CONTENT_SETS:
-        try:
-            for filename, url in _list_files(api_path, include_ext):
-                all_links.append((filename, url, subdir))
-        except RuntimeError as exc:
-            result.errors.append(("", str(exc)))
-
-    if not all_links:
-        return result
-
-    if dry_run:
-        for filename, _url, subdir in all_links:
-            target = dest / subdir / filename
-            if not force and target.exists() and target.stat().st_size > 0:
-                result.skipped.append(filename)
-            else:
-                result.downloaded.append(filename)
-        return result
-
-    dest.mkdir(parents=True, exist_ok=True)
-    session = requests.Session()
-
-    for filename, url, subdir in all_links:
-        target = dest / subdir / filename
-        ok, msg = download_file(session, url, target, force=force, state=state)
-        if msg == "skipped":
-            result.skipped.append(filename)
-        elif ok:
-            result.downloaded.append(filename)
-        else:
-            result.errors.append((filename, msg))
-
-    return result
+"""FedRAMP automation artifacts downloader.
+
+Downloads Rev 5 OSCAL content and guide documents from the GSA/fedramp-automation
+GitHub repository:
+
+  baselines/   — OSCAL profiles and resolved catalogs (HIGH/MODERATE/LOW/LI-SaaS)
+  resources/   — FedRAMP extensions, threats, values, and information types
+  templates/   — OSCAL templates (SSP, SAP, SAR, POAM)
+  guides/      — OSCAL implementation guide PDFs
+
+A single Git Trees API call discovers every file (cached with its ETag in
+.github-tree.json); actual downloads come from raw.githubusercontent.com. Set
+the GITHUB_TOKEN environment variable to raise the unauthenticated API rate
+limit from 60 to 5,000 requests/hour if needed.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import quote
+
+import requests
+
+if TYPE_CHECKING:
+    from compligator.state import StateFile
+
+from .base import (
+    GITHUB_RAW_BASE,
+    REQUEST_TIMEOUT,
+    USER_AGENT,
+    DownloadResult,
+    download_file,
+    get_session,
+    get_with_retry,
+    github_tree,
+    has_content,
+)
+
+SOURCE_URL = "https://github.com/GSA/fedramp-automation"
+REPO = "GSA/fedramp-automation"
+REPO_API_BASE = "https://api.github.com/repos/GSA/fedramp-automation/contents"
+TREE_CACHE = ".github-tree.json"
+DOWNLOAD_WORKERS = 4
+
+# (GitHub API path, local subdir under dest, file extensions to include)
+CONTENT_SETS: list[tuple[str, str, set[str]]] = [
+    ("dist/content/rev5/baselines/json",    "baselines",  {".json"}),
+    ("dist/content/rev5/resources/json",    "resources",  {".json"}),
+    ("dist/content/rev5/templates/ssp/json", "templates", {".json"}),
+    ("dist/content/rev5/templates/sap/json", "templates", {".json"}),
+    ("dist/content/rev5/templates/sar/json", "templates", {".json"}),
+    ("dist/content/rev5/templates/poam/json", "templates", {".json"}),
+    ("documents/rev5",                      "guides",     {".pdf"}),
+]
+
+
+# ---------------------------------------------------------------------------
+# GitHub API helpers
+# ---------------------------------------------------------------------------
+
+
+def _api_headers() -> dict[str, str]:
+    """Build request headers, including a GitHub token if set in the environment."""
+    headers = {"User-Agent": USER_AGENT, "Accept": "application/vnd.github+json"}
+    token = os.environ.get("GITHUB_TOKEN")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def _include(name: str, include_ext: set[str]) -> bool:
+    return Path(name).suffix.lower() in include_ext and not name.endswith("-min.json")
+
+
+def _list_files(api_path: str, include_ext: set[str]) -> list[tuple[str, str]]:
+    """Return (filename, download_url) for matching files in a repo directory.
+
+    Skips minified JSON variants (*-min.json) and subdirectories.
+    Raises RuntimeError on API errors.
+    """
+    url = f"{REPO_API_BASE}/{api_path}"
+    try:
+        resp = get_with_retry(url, headers=_api_headers(), timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as exc:
+        raise RuntimeError(f"GitHub API request failed for {api_path}: {exc}") from exc
+
+    if resp.status_code == 403:
+        raise RuntimeError(
+            f"GitHub API rate-limited ({api_path}). "
+            "Set GITHUB_TOKEN env var to increase the unauthenticated limit."
+        )
+    if resp.status_code != 200:
+        raise RuntimeError(f"GitHub API returned {resp.status_code} for {api_path}")
+
+    return [
+        (item["name"], item["download_url"])
+        for item in resp.json()
+        if item["type"] == "file" and _include(item["name"], include_ext)
+    ]
+
+
+def _list_tree(cache_path: Path, save: bool) -> Optional[list[tuple[str, str, str]]]:
+    """Return (filename, download_url, subdir) for every CONTENT_SETS file.
+
+    Uses one Git Trees API call instead of a Contents call per directory.
+    Returns None if the tree was truncated. Raises RuntimeError on API errors.
+    """
+    paths = github_tree(REPO, _api_headers(), cache_path, save=save)
+    if paths is None:
+        return None
+
+    by_dir: dict[str, list[str]] = {api_path: [] for api_path, _, _ in CONTENT_SETS}
+    for path in paths:
+        directory, _, name = path.rpartition("/")
+        if directory in by_dir:
+            by_dir[directory].append(name)
+
+    links: list[tuple[str, str, str]] = []
+    for api_path, subdir, include_ext in CONTENT_SETS:
+        for name in by_dir[api_path]:
+            if _include(name, include_ext):
+                url = f"{GITHUB_RAW_BASE}/{REPO}/HEAD/{quote(f'{api_path}/{name}')}"
+                links.append((name, url, subdir))
+    return links
+
+
+def _list_directories(result: DownloadResult) -> list[tuple[str, str, str]]:
+    """Fallback for a truncated tree: list each CONTENT_SETS directory concurrently."""
+    all_links: list[tuple[str, str, str]] = []  # (filename, url, subdir)
+
+    def _list(
+        content_set: tuple[str, str, set[str]],
+    ) -> tuple[str, list[tuple[str, str]], Optional[str]]:
+        api_path, subdir, include_ext = content_set
+        try:
+            return subdir, _list_files(api_path, include_ext), None
+        except RuntimeError as exc:
+            return subdir, [], str(exc)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(CONTENT_SETS)) as executor:
+        for subdir, files, error in executor.map(_list, CONTENT_SETS):
+            if error is not None:
+                result.errors.append(("", error))
+                continue
+            for filename, url in files:
+                all_links.append((filename, url, subdir))
+
+    return all_links
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+
+def run(
+    output_dir: Path,
+    dry_run: bool = False,
+    force: bool = False,
+    state: Optional["StateFile"] = None,
+) -> DownloadResult:
+    dest = output_dir / "fedramp-github"
+    result = DownloadResult(framework="fedramp-github")
+
+    # Discover all files via the Git Trees API
+    try:
+        all_links = _list_tree(dest / TREE_CACHE, save=not dry_run)
+    except RuntimeError as exc:
+        result.errors.append(("", str(exc)))
+        return result
+    if all_links is None:
+        all_links = _list_directories(result)
+
+    if not all_links:
+        return result
+
+    if dry_run:
+        for filename, _url, subdir in all_links:
+            target = dest / subdir / filename
+            if not force and has_content(target):
+                result.skipped.append(filename)
+            else:
+                result.downloaded.append(filename)
+        return result
+
+    dest.mkdir(parents=True, exist_ok=True)
+    session = get_session()
+    if state is not None and not force:
+        state.adopt_many(
+            (dest / subdir / filename, url) for filename, url, subdir in all_links
+        )
+
+    def _download(item: tuple[str, str, str]) -> tuple[str, bool, str]:
+        filename, url, subdir = item
+        target = dest / subdir / filename
+        ok, msg = download_file(session, url, target, force=force, state=state)
+        return filename, ok, msg
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        for filename, ok, msg in executor.map(_download, all_links):
+            if msg == "skipped":
+                result.skipped.append(filename)
+            elif ok:
+                result.downloaded.append(filename)
+            else:
+                result.errors.append((filename, msg))
+
+    return result
@@ -1,286 +1,366 @@
-"""NIST publications downloader — final and draft series."""
-
-from __future__ import annotations
-
-import concurrent.futures
-import re
-import time
-from pathlib import Path
-from typing import TYPE_CHECKING, Optional
-from urllib.parse import urljoin, urlparse
-
-import requests
-from bs4 import BeautifulSoup
-
-if TYPE_CHECKING:
-    from compligator.state import StateFile
-
-from .base import (
-    REQUEST_RETRIES,
-    REQUEST_TIMEOUT,
-    RETRY_DELAY,
-    DownloadResult,
-    sanitize_filename,
-)
-
-# Per-series rate limiting constants (not in base since NIST-specific)
-LISTING_RATE_DELAY = 0.8
-DETAIL_RATE_DELAY = 0.5
-DOWNLOAD_RATE_DELAY = 0.2
-DETAIL_WORKERS = 6
-DOWNLOAD_WORKERS = 4
-
-FINAL_LISTING_URL = "https://csrc.nist.gov/publications/final-pubs"
-DRAFT_LISTING_URL = "https://csrc.nist.gov/publications/draft-pubs"
-
-HEADERS = {"User-Agent": "cwm-nist-dl (https://csrc.nist.gov/)"}
-
-DRAFT_TERMINATORS = {"draft", "ipd", "fpd", "pd", "iprd", "2pd"}
-
-
-# ---------------------------------------------------------------------------
-# Listing crawl
-# ---------------------------------------------------------------------------
-
-def _listing_urls(base: str) -> list[str]:
-    """Yield paginated listing URLs until exhausted."""
-    urls = []
-    page = 0
-    while True:
-        urls.append(base if page == 0 else f"{base}?page={page}")
-        page += 1
-        if page > 500:  # safety cap
-            break
-    return urls
-
-
-def _fetch(session: requests.Session, url: str, delay: float) -> Optional[str]:
-    time.sleep(delay)
-    for attempt in range(REQUEST_RETRIES):
-        try:
-            resp = session.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-            if resp.status_code == 200:
-                return resp.text
-            if resp.status_code == 404:
-                return None
-        except requests.RequestException:
-            pass
-        if attempt < REQUEST_RETRIES - 1:
-            time.sleep(RETRY_DELAY)
-    return None
-
-
-def _parse_listing(html: str, origin: str, series_type: str) -> list[str]:
-    """Extract detail page URLs from a listing page."""
-    soup = BeautifulSoup(html, "html.parser")
-    pattern = (
-        r"/pubs/.+/final"
-        if series_type == "finals"
-        else r"/pubs/.+/(?:draft|ipd|fpd|pd|iprd|2pd)(?:/|$)"
-    )
-    links: list[str] = []
-    seen: set[str] = set()
-    for anchor in soup.find_all("a", href=True):
-        href = anchor["href"]
-        if not href or not re.search(pattern, href):
-            continue
-        url = urljoin(origin, href)
-        if url not in seen:
-            seen.add(url)
-            links.append(url)
-    return links
-
-
-def _crawl_listings(session: requests.Session, base_url: str, series_type: str) -> list[str]:
-    all_links: list[str] = []
-    seen: set[str] = set()
-    for url in _listing_urls(base_url):
-        html = _fetch(session, url, LISTING_RATE_DELAY)
-        if not html:
-            break
-        new = [link for link in _parse_listing(html, url, series_type) if link not in seen]
-        if not new:
-            break
-        all_links.extend(new)
-        seen.update(new)
-    return all_links
-
-
-# ---------------------------------------------------------------------------
-# Detail page parsing
-# ---------------------------------------------------------------------------
-
-def _extract_series_number(url: str, series_type: str) -> tuple[str, str]:
-    parts = [p for p in urlparse(url).path.split("/") if p]
-    try:
-        idx = parts.index("pubs") + 1
-        series = parts[idx].lower()
-        terminators = {"final"} if series_type == "finals" else DRAFT_TERMINATORS
-        number_parts = []
-        for part in parts[idx + 1:]:
-            if part.lower() in terminators:
-                break
-            number_parts.append(part)
-        number = "-".join(number_parts) or "unknown"
-    except (ValueError, IndexError):
-        series, number = "unknown", "unknown"
-    return series, number
-
-
-def _parse_detail(html: str, detail_url: str) -> Optional[str]:
-    """Return the PDF download URL from a detail page, or None."""
-    soup = BeautifulSoup(html, "html.parser")
-    for anchor in soup.find_all("a", href=True):
-        href = anchor["href"]
-        text = anchor.get_text(strip=True).lower()
-        if href.lower().endswith(".pdf"):
-            return urljoin(detail_url, href)
-        if "nvlpubs.nist.gov" in href.lower():
-            return urljoin(detail_url, href)
-        if "download" in text and href.startswith("http"):
-            return urljoin(detail_url, href)
-    return None
-
-
-# ---------------------------------------------------------------------------
-# Download
-# ---------------------------------------------------------------------------
-
-def _download_pub(
-    session: requests.Session,
-    detail_url: str,
-    download_url: str,
-    base_dir: Path,
-    series: str,
-    series_type: str,
-    force: bool,
-    state: Optional["StateFile"] = None,
-) -> tuple[str, bool, str]:
-    """Download one publication. Returns (filename, success, message)."""
-    ser, _num = _extract_series_number(detail_url, series_type)
-    filename = sanitize_filename(Path(urlparse(download_url).path).name or f"{ser}.pdf")
-    target = base_dir / series / filename
-
-    if not force:
-        if state is not None:
-            if state.needs_adopt(target):
-                state.adopt(target, download_url)
-            if state.is_fresh(target, download_url):
-                return filename, True, "skipped"
-        elif target.exists() and target.stat().st_size > 0:
-            return filename, True, "skipped"
-
-    target.parent.mkdir(parents=True, exist_ok=True)
-    time.sleep(DOWNLOAD_RATE_DELAY)
-
-    for attempt in range(REQUEST_RETRIES):
-        try:
-            with session.get(
-                download_url, headers=HEADERS, timeout=120, stream=True
-            ) as resp:
-                if resp.status_code == 200:
-                    with target.open("wb") as fh:
-                        for chunk in resp.iter_content(chunk_size=8192):
-                            if chunk:
-                                fh.write(chunk)
-                    if target.stat().st_size == 0:
-                        target.unlink(missing_ok=True)
-                        raise OSError("Empty file")
-                    if state is not None:
-                        state.record(target, download_url)
-                    return filename, True, "downloaded"
-                if resp.status_code == 404:
-                    return filename, False, "not found (404)"
-        except requests.RequestException as exc:
-            if attempt < REQUEST_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
-            else:
-                return filename, False, f"failed: {exc}"
-
-    return filename, False, "failed after retries"
-
-
-# ---------------------------------------------------------------------------
-# Public interface
-# ---------------------------------------------------------------------------
-
-def _run(
-    output_dir: Path,
-    series_type: str,
-    dry_run: bool,
-    force: bool,
-    state: Optional["StateFile"] = None,
-) -> DownloadResult:
-    result = DownloadResult(framework=f"nist-{series_type}")
-    base_url = FINAL_LISTING_URL if series_type == "finals" else DRAFT_LISTING_URL
-    subdir = "final-pubs" if series_type == "finals" else "draft-pubs"
-    base_dir = output_dir / "nist" / subdir
-
-    session = requests.Session()
-
-    detail_urls = _crawl_listings(session, base_url, series_type)
-    if not detail_urls:
-        result.errors.append(("", "No publication pages found — CSRC listing may have changed"))
-        return result
-
-    # Fetch detail pages concurrently to extract download URLs
-    pub_map: dict[str, Optional[str]] = {}
-    with concurrent.futures.ThreadPoolExecutor(max_workers=DETAIL_WORKERS) as ex:
-        futures = {ex.submit(_fetch, session, url, DETAIL_RATE_DELAY): url for url in detail_urls}
-        for future in concurrent.futures.as_completed(futures):
-            url = futures[future]
-            html = future.result()
-            pub_map[url] = _parse_detail(html, url) if html else None
-
-    downloadable = [(durl, purl) for durl, purl in pub_map.items() if purl]
-
-    if dry_run:
-        for detail_url, download_url in downloadable:
-            ser, _num = _extract_series_number(detail_url, series_type)
-            filename = sanitize_filename(Path(urlparse(download_url).path).name or f"{ser}.pdf")
-            target = base_dir / ser / filename
-            if not force and target.exists() and target.stat().st_size > 0:
-                result.skipped.append(filename)
-            else:
-                result.downloaded.append(filename)
-        return result
-
-    base_dir.mkdir(parents=True, exist_ok=True)
-
-    def _dl(item: tuple[str, str]) -> tuple[str, bool, str]:
-        detail_url, download_url = item
-        ser, _num = _extract_series_number(detail_url, series_type)
-        return _download_pub(
-            session, detail_url, download_url, base_dir, ser, series_type, force, state
-        )
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as ex:
-        for filename, ok, msg in ex.map(_dl, downloadable):
-            if msg == "skipped":
-                result.skipped.append(filename)
-            elif ok:
-                result.downloaded.append(filename)
-            else:
-                result.errors.append((filename, msg))
-
-    return result
-
-
-def run_finals(
-    output_dir: Path,
-    dry_run: bool = False,
-    force: bool = False,
-    state: Optional["StateFile"] = None,
-) -> DownloadResult:
-    """Download NIST final publications."""
-    return _run(output_dir, "finals", dry_run, force, state)
-
-
-def run_drafts(
-    output_dir: Path,
-    dry_run: bool = False,
-    force: bool = False,
-    state: Optional["StateFile"] = None,
-) -> DownloadResult:
-    """Download NIST draft publications."""
-    return _run(output_dir, "drafts", dry_run, force, state)
+"""NIST publications downloader — final and draft series."""
+
+from __future__ import annotations
+
+import concurrent.futures
+import json
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterator, Optional, TypeVar
+from urllib.parse import urljoin, urlparse
+
+import lxml.html
+import requests
+from lxml.etree import ParserError
+
+if TYPE_CHECKING:
+    from compligator.state import StateFile
+
+from .base import (
+    REQUEST_TIMEOUT,
+    DownloadResult,
+    HostLimiter,
+    download_file,
+    get_session,
+    get_with_retry,
+    has_content,
+    sanitize_filename,
+    write_atomic,
+)
+
+# Per-series rate limiting constants (not in base since NIST-specific)
+LISTING_RATE_DELAY = 0.8
+DETAIL_RATE_DELAY = 0.5
+DOWNLOAD_RATE_DELAY = 0.2
+DETAIL_WORKERS = 6
+DOWNLOAD_WORKERS = 4
+HOST_CONCURRENCY = 4
+
+# Each phase is paced per host (csrc.nist.gov and nvlpubs.nist.gov separately)
+# at the request rate its workers used to reach by sleeping *_RATE_DELAY
+# before every request, but a worker only waits when that pace is exceeded.
+_listing_limiter = HostLimiter(1 / LISTING_RATE_DELAY, concurrency=HOST_CONCURRENCY)
+_detail_limiter = HostLimiter(DETAIL_WORKERS / DETAIL_RATE_DELAY, concurrency=HOST_CONCURRENCY)
+_download_limiter = HostLimiter(
+    DOWNLOAD_WORKERS / DOWNLOAD_RATE_DELAY, concurrency=HOST_CONCURRENCY
+)
+
+# Validators and parse results of the listing and detail pages, kept per
+# series so the next sync can revalidate each page with a conditional GET
+# and reuse the stored result on 304 instead of re-fetching and re-parsing.
+PAGE_CACHE = ".page-cache.json"
+
+FINAL_LISTING_URL = "https://csrc.nist.gov/publications/final-pubs"
+DRAFT_LISTING_URL = "https://csrc.nist.gov/publications/draft-pubs"
+
+HEADERS = {"User-Agent": "cwm-nist-dl (https://csrc.nist.gov/)"}
+
+DRAFT_TERMINATORS = {"draft", "ipd", "fpd", "pd", "iprd", "2pd"}
+
+# Detail-page hrefs on each series' listing pages.
+_FINAL_HREF_RE = re.compile(r"/pubs/.+/final")
+_DRAFT_HREF_RE = re.compile(r"/pubs/.+/(?:draft|ipd|fpd|pd|iprd|2pd)(?:/|$)")
+
+
+# ---------------------------------------------------------------------------
+# Listing crawl
+# ---------------------------------------------------------------------------
+
+def _listing_urls(base: str) -> list[str]:
+    """Yield paginated listing URLs until exhausted."""
+    urls = []
+    page = 0
+    while True:
+        urls.append(base if page == 0 else f"{base}?page={page}")
+        page += 1
+        if page > 500:  # safety cap
+            break
+    return urls
+
+
+_T = TypeVar("_T")
+
+
+def _load_page_cache(path: Path) -> dict[str, dict]:
+    try:
+        cache = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _save_page_cache(path: Path, cache: dict[str, dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(path, json.dumps(cache).encode("utf-8"))
+
+
+def _fetch_parsed(
+    session: requests.Session,
+    url: str,
+    limiter: HostLimiter,
+    cached: Optional[dict],
+    parse: Callable[[str], _T],
+) -> tuple[Optional[_T], Optional[dict]]:
+    """GET url and return (parse(html), page-cache entry), or (None, None) on failure.
+
+    *cached* is the page's entry from the previous sync: its validators make
+    the GET conditional, and on 304 its stored result is returned unparsed.
+    The entry is None when the server sent no ETag or Last-Modified.
+    Transient errors are retried by the session's adapter; a single call here.
+    """
+    headers = dict(HEADERS)
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        with limiter.slot(url):
+            resp = get_with_retry(url, session=session, headers=headers, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException:
+        return None, None
+    if resp.status_code == 304 and cached:
+        return cached.get("result"), cached
+    if resp.status_code != 200:
+        return None, None
+    result = parse(resp.text)
+    etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+    if not etag and not last_modified:
+        return result, None
+    return result, {"etag": etag, "last_modified": last_modified, "result": result}
+
+
+def _anchors(html: str) -> Iterator[tuple[str, str]]:
+    """Yield (href, text) for every <a href> on the page, in document order.
+
+    lxml's own tree and iterator are used directly — no BeautifulSoup
+    objects are built.
+    """
+    try:
+        try:
+            root = lxml.html.fromstring(html)
+        except ValueError:
+            # lxml refuses a str that carries an XML encoding declaration.
+            root = lxml.html.fromstring(html.encode("utf-8"))
+    except ParserError:  # empty or whitespace-only document
+        return
+    for anchor in root.iter("a"):
+        href = anchor.get("href")
+        if href is not None:
+            yield href, anchor.text_content()
+
+
+def _parse_listing(html: str, origin: str, series_type: str) -> list[str]:
+    """Extract detail page URLs from a listing page."""
+    pattern = _FINAL_HREF_RE if series_type == "finals" else _DRAFT_HREF_RE
+    hrefs = (href for href, _text in _anchors(html) if href and pattern.search(href))
+    # dict.fromkeys dedupes in first-seen order.
+    return list(dict.fromkeys(urljoin(origin, href) for href in hrefs))
+
+
+def _crawl_listings(
+    session: requests.Session,
+    base_url: str,
+    series_type: str,
+    cache: dict[str, dict],
+    fresh: dict[str, dict],
+) -> list[str]:
+    """Return every detail URL in the series; page-cache entries go into *fresh*."""
+    found: dict[str, None] = {}  # insertion-ordered set of detail URLs
+    for url in _listing_urls(base_url):
+        links, entry = _fetch_parsed(
+            session,
+            url,
+            _listing_limiter,
+            cache.get(url),
+            lambda html: _parse_listing(html, url, series_type),
+        )
+        if entry:
+            fresh[url] = entry
+        if not links:
+            break
+        before = len(found)
+        found.update(dict.fromkeys(links))
+        if len(found) == before:  # nothing new: paged past the end
+            break
+    return list(found)
+
+
+# ---------------------------------------------------------------------------
+# Detail page parsing
+# ---------------------------------------------------------------------------
+
+def _extract_series_number(url: str, series_type: str) -> tuple[str, str]:
+    parts = [p for p in urlparse(url).path.split("/") if p]
+    try:
+        idx = parts.index("pubs") + 1
+        series = parts[idx].lower()
+        terminators = {"final"} if series_type == "finals" else DRAFT_TERMINATORS
+        number_parts = []
+        for part in parts[idx + 1:]:
+            if part.lower() in terminators:
+                break
+            number_parts.append(part)
+        number = "-".join(number_parts) or "unknown"
+    except (ValueError, IndexError):
+        series, number = "unknown", "unknown"
+    return series, number
+
+
+def _parse_detail(html: str, detail_url: str) -> Optional[str]:
+    """Return the PDF download URL from a detail page, or None.
+
+    The first direct PDF or nvlpubs.nist.gov link wins as soon as it is seen;
+    an absolute link whose text says "download" is used only if neither
+    appears anywhere on the page.
+    """
+    fallback: Optional[str] = None
+    for href, text in _anchors(html):
+        lowered = href.lower()
+        if lowered.endswith(".pdf") or "nvlpubs.nist.gov" in lowered:
+            return urljoin(detail_url, href)
+        if fallback is None and href.startswith("http") and "download" in text.lower():
+            fallback = href
+    return urljoin(detail_url, fallback) if fallback else None
+
+
+def _resolve_detail(
+    session: requests.Session, detail_url: str, cached: Optional[dict]
+) -> tuple[Optional[str], Optional[dict]]:
+    """Return (download URL or None, page-cache entry) for a detail page."""
+    return _fetch_parsed(
+        session,
+        detail_url,
+        _detail_limiter,
+        cached,
+        lambda html: _parse_detail(html, detail_url),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Download
+# ---------------------------------------------------------------------------
+
+def _pub_target(base_dir: Path, detail_url: str, download_url: str, series_type: str) -> Path:
+    """Return the local path a publication is saved to."""
+    ser, _num = _extract_series_number(detail_url, series_type)
+    filename = sanitize_filename(Path(urlparse(download_url).path).name or f"{ser}.pdf")
+    return base_dir / ser / filename
+
+
+def _download_pub(
+    session: requests.Session,
+    download_url: str,
+    target: Path,
+    force: bool,
+    state: Optional["StateFile"] = None,
+) -> tuple[str, bool, str]:
+    """Download one publication to target. Returns (filename, success, message).
+
+    download_file() supplies the skip checks, including the HEAD preflight
+    that keeps an unchanged copy without re-fetching it.
+    """
+    ok, msg = download_file(
+        session,
+        download_url,
+        target,
+        force=force,
+        state=state,
+        headers=HEADERS,
+        limiter=_download_limiter,
+    )
+    return target.name, ok, msg
+
+
+# ---------------------------------------------------------------------------
+# Public interface
+# ---------------------------------------------------------------------------
+
+def _run(
+    output_dir: Path,
+    series_type: str,
+    dry_run: bool,
+    force: bool,
+    state: Optional["StateFile"] = None,
+) -> DownloadResult:
+    result = DownloadResult(framework=f"nist-{series_type}")
+    base_url = FINAL_LISTING_URL if series_type == "finals" else DRAFT_LISTING_URL
+    subdir = "final-pubs" if series_type == "finals" else "draft-pubs"
+    base_dir = output_dir / "nist" / subdir
+
+    session = get_session()
+    cache_path = base_dir / PAGE_CACHE
+    cache = _load_page_cache(cache_path)
+    fresh: dict[str, dict] = {}
+
+    detail_urls = _crawl_listings(session, base_url, series_type, cache, fresh)
+    if not detail_urls:
+        result.errors.append(("", "No publication pages found — CSRC listing may have changed"))
+        return result
+
+    # Each worker fetches and parses its own detail page, so parsing overlaps
+    # the other workers' network waits instead of queueing on this thread.
+    pub_map: dict[str, Optional[str]] = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=DETAIL_WORKERS) as ex:
+        resolved = ex.map(lambda url: _resolve_detail(session, url, cache.get(url)), detail_urls)
+        for url, (download_url, entry) in zip(detail_urls, resolved):
+            pub_map[url] = download_url
+            if entry:
+                fresh[url] = entry
+    # Only pages seen this sync are kept, so delisted publications age out.
+    if not dry_run:
+        _save_page_cache(cache_path, fresh)
+
+    # Resolve each publication's local path once; every later stage reuses it.
+    downloadable = [
+        (purl, _pub_target(base_dir, durl, purl, series_type))
+        for durl, purl in pub_map.items()
+        if purl
+    ]
+
+    if dry_run:
+        for _download_url, target in downloadable:
+            if not force and has_content(target):
+                result.skipped.append(target.name)
+            else:
+                result.downloaded.append(target.name)
+        return result
+
+    base_dir.mkdir(parents=True, exist_ok=True)
+    if state is not None and not force:
+        state.adopt_many((target, download_url) for download_url, target in downloadable)
+
+    def _dl(item: tuple[str, Path]) -> tuple[str, bool, str]:
+        download_url, target = item
+        return _download_pub(session, download_url, target, force, state)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as ex:
+        for filename, ok, msg in ex.map(_dl, downloadable):
+            if msg == "skipped":
+                result.skipped.append(filename)
+            elif ok:
+                result.downloaded.append(filename)
+            else:
+                result.errors.append((filename, msg))
+
+    return result
+
+
+def run_finals(
+    output_dir: Path,
+    dry_run: bool = False,
+    force: bool = False,
+    state: Optional["StateFile"] = None,
+) -> DownloadResult:
+    """Download NIST final publications."""
+    return _run(output_dir, "finals", dry_run, force, state)
+
+
+def run_drafts(
+    output_dir: Path,
+    dry_run: bool = False,
+    force: bool = False,
+    state: Optional["StateFile"] = None,
+) -> DownloadResult:
+    """Download NIST draft publications."""
+    return _run(output_dir, "drafts", dry_run, force, state)
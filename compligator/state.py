@@ -1,137 +1,394 @@
-"""Hash-based sync state file for CompliGator."""
-
-from __future__ import annotations
-
-import hashlib
-import json
-import os
-import threading
-from datetime import datetime, timezone
-from pathlib import Path
-
-STATE_FILENAME = ".compligator-state.json"
-_SCHEMA_VERSION = 1
-
-
-class StateFile:
-    """Persistent record of downloaded files indexed by SHA-256 hash.
-
-    Thread-safe: used by downloaders that run workers via ThreadPoolExecutor.
-    The state file is written atomically (tmp → rename) to prevent corruption.
-    """
-
-    def __init__(self, output_dir: Path) -> None:
-        self._output_dir = output_dir
-        self._path = output_dir / STATE_FILENAME
-        self._lock = threading.Lock()
-        self._entries: dict[str, dict] = {}
-        self._load()
-
-    # ------------------------------------------------------------------
-    # Public read API
-    # ------------------------------------------------------------------
-
-    def needs_adopt(self, path: Path) -> bool:
-        """Return True if *path* exists on disk but has no state record."""
-        if not path.exists() or path.stat().st_size == 0:
-            return False
-        key = self._key(path)
-        with self._lock:
-            return key not in self._entries
-
-    def is_fresh(self, path: Path, url: str) -> bool:
-        """Return True if *path* is tracked and its on-disk hash matches.
-
-        Does NOT modify state — call adopt() first for untracked files.
-        Returns False if path is absent, empty, untracked, or hash-mismatched.
-        """
-        if not path.exists() or path.stat().st_size == 0:
-            return False
-        key = self._key(path)
-        with self._lock:
-            entry = self._entries.get(key)
-        if entry is None:
-            return False
-        return _sha256(path) == entry["sha256"]
-
-    def entries(self) -> dict[str, dict]:
-        """Return a snapshot of all entries (for status display)."""
-        with self._lock:
-            return dict(self._entries)
-
-    # ------------------------------------------------------------------
-    # Public write API
-    # ------------------------------------------------------------------
-
-    def adopt(self, path: Path, url: str) -> None:
-        """Hash an existing file and add it to state without re-downloading.
-
-        Idempotent — safe to call even if already recorded (overwrites).
-        Used on first run to fingerprint files downloaded before state tracking.
-        """
-        entry = _build_entry(path, url)
-        key = self._key(path)
-        with self._lock:
-            self._entries[key] = entry
-            self._save()
-
-    def record(self, path: Path, url: str) -> None:
-        """Hash a freshly downloaded file and persist its metadata."""
-        entry = _build_entry(path, url)
-        key = self._key(path)
-        with self._lock:
-            self._entries[key] = entry
-            self._save()
-
-    # ------------------------------------------------------------------
-    # Internal
-    # ------------------------------------------------------------------
-
-    def _key(self, path: Path) -> str:
-        try:
-            return path.relative_to(self._output_dir).as_posix()
-        except ValueError:
-            return str(path)
-
-    def _load(self) -> None:
-        if not self._path.exists():
-            return
-        try:
-            raw = json.loads(self._path.read_text(encoding="utf-8"))
-            if raw.get("schema_version") == _SCHEMA_VERSION:
-                self._entries = raw.get("entries", {})
-        except (json.JSONDecodeError, OSError, KeyError):
-            self._entries = {}
-
-    def _save(self) -> None:
-        """Write state to disk atomically. Caller must hold self._lock."""
-        self._path.parent.mkdir(parents=True, exist_ok=True)
-        payload = json.dumps(
-            {"schema_version": _SCHEMA_VERSION, "entries": self._entries},
-            indent=2,
-            ensure_ascii=False,
-        )
-        tmp = self._path.with_suffix(".tmp")
-        tmp.write_text(payload, encoding="utf-8")
-        os.replace(tmp, self._path)
-
-
-# ------------------------------------------------------------------
-# Module-level helpers
-# ------------------------------------------------------------------
-
-def _sha256(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as fh:
-        for chunk in iter(lambda: fh.read(65536), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
-
-def _build_entry(path: Path, url: str) -> dict:
-    return {
-        "sha256": _sha256(path),
-        "url": url,
-        "size": path.stat().st_size,
-        "recorded_at": datetime.now(timezone.utc).isoformat(),
-    }
+"""Hash-based sync state file for CompliGator."""
+
+from __future__ import annotations
+
+import concurrent.futures
+import hashlib
+import io
+import json
+import mmap
+import os
+import threading
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from pathlib import Path
+from types import MappingProxyType
+from typing import BinaryIO, Iterable, Mapping, Optional
+
+STATE_FILENAME = ".compligator-state.json"
+_SCHEMA_VERSION = 3
+# Version 2 added "mtime_ns" to entries; version 1 files load unchanged and
+# gain it the first time each file is verified by hash. Version 3 added
+# "hash_algo": the digest is stored under the algorithm's name, and entries
+# without the field are SHA-256.
+_COMPATIBLE_VERSIONS = (1, 2, _SCHEMA_VERSION)
+
+# Content fingerprint for new entries. The digest is an integrity check, not
+# an attestation, so the much faster BLAKE3 is used whenever it is installed.
+HASH_ALGO = "blake3" if find_spec("blake3") else "sha256"
+
+# Changes are written at most this often; flush() (or leaving a `with` block)
+# writes immediately.
+_SAVE_INTERVAL = 0.5
+
+
+class StateFile:
+    """Persistent record of downloaded files indexed by content hash.
+
+    Thread-safe: used by downloaders that run workers via ThreadPoolExecutor.
+    The state file is written atomically (tmp → rename) to prevent corruption.
+    Saves are deferred: a burst of record()/adopt() calls from parallel workers
+    results in one write per _SAVE_INTERVAL rather than one per file. Use as a
+    context manager, or call flush(), to guarantee pending changes hit disk.
+    """
+
+    def __init__(self, output_dir: Path) -> None:
+        self._output_dir = output_dir
+        self._path = output_dir / STATE_FILENAME
+        self._lock = threading.Lock()
+        # Serializes disk writes so snapshots land in the order they were taken.
+        self._save_lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self._load()
+
+    def __enter__(self) -> "StateFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    # ------------------------------------------------------------------
+    # Public read API
+    # ------------------------------------------------------------------
+
+    def needs_adopt(self, path: Path) -> bool:
+        """Return True if *path* exists on disk but has no state record."""
+        return self._untracked_stat(path) is not None
+
+    def is_fresh(self, path: Path, url: str) -> bool:
+        """Return True if *path* is tracked and its on-disk hash matches.
+
+        A file whose size and mtime_ns still match the entry is trusted without
+        re-hashing (as rsync and git's index do); otherwise it is hashed, and a
+        match refreshes the recorded mtime so the next check is a bare stat.
+        An entry recorded with another algorithm than HASH_ALGO is re-hashed
+        with HASH_ALGO at that point, migrating it.
+        Does not add entries — call adopt() first for untracked files.
+        Returns False if path is absent, empty, untracked, or hash-mismatched,
+        or if the entry's algorithm is not available.
+        """
+        try:
+            st = path.stat()
+        except OSError:
+            return False
+        if st.st_size == 0:
+            return False
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return False
+        if entry.get("mtime_ns") == st.st_mtime_ns and entry.get("size") == st.st_size:
+            return True
+        algo = entry.get("hash_algo", "sha256")
+        if algo not in ("sha256", HASH_ALGO):
+            return False
+        if _hash_file(path, algo) != entry.get(algo):
+            return False
+        updated = {**entry, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        if algo != HASH_ALGO:
+            del updated[algo]
+            updated["hash_algo"] = HASH_ALGO
+            updated[HASH_ALGO] = _hash_file(path)
+        with self._lock:
+            if self._entries.get(key) is entry:
+                self._entries[key] = updated
+                self._mark_dirty()
+        return True
+
+    def validators(self, path: Path) -> tuple[Optional[str], Optional[str]]:
+        """Return the (ETag, Last-Modified) pair recorded for *path*, if any."""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key) or {}
+        return entry.get("etag"), entry.get("last_modified")
+
+    def entries(self) -> Mapping[str, dict]:
+        """Return a read-only, zero-copy view of all entries (for status display).
+
+        The view is live: iterate it only while no sync is running, and use
+        snapshot() when a stable or mutable copy is needed.
+        """
+        return MappingProxyType(self._entries)
+
+    def snapshot(self) -> dict[str, dict]:
+        """Return a point-in-time copy of all entries."""
+        with self._lock:
+            return dict(self._entries)
+
+    # ------------------------------------------------------------------
+    # Public write API
+    # ------------------------------------------------------------------
+
+    def adopt(self, path: Path, url: str) -> None:
+        """Hash an existing file and add it to state without re-downloading.
+
+        Idempotent — safe to call even if already recorded (overwrites).
+        Used on first run to fingerprint files downloaded before state tracking.
+        """
+        entry = _build_entry(path, url)
+        key = self._key(path)
+        with self._lock:
+            self._entries[key] = entry
+            self._mark_dirty()
+
+    def adopt_many(self, pairs: Iterable[tuple[Path, str]]) -> int:
+        """Adopt every untracked, non-empty file in *pairs* with one state write.
+
+        Hashing runs on a thread pool — hashlib releases the GIL — so the first
+        sync over an existing download tree fingerprints files in parallel.
+        Returns the number of files adopted.
+        """
+        todo = []
+        for path, url in pairs:
+            st = self._untracked_stat(path)
+            if st is not None:
+                todo.append((path, url, st))
+        if not todo:
+            return 0
+
+        def _entry(item: tuple[Path, str, os.stat_result]) -> Optional[tuple[str, dict]]:
+            path, url, st = item
+            try:
+                return self._key(path), _build_entry(path, url, st=st)
+            except OSError:
+                return None
+
+        workers = min(len(todo), os.cpu_count() or 1)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            built = [item for item in executor.map(_entry, todo) if item is not None]
+
+        with self._lock:
+            self._entries.update(built)
+            self._mark_dirty()
+        return len(built)
+
+    def record(
+        self,
+        path: Path,
+        url: str,
+        *,
+        digest: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """Hash a freshly downloaded file and persist its metadata.
+
+        Pass *digest* (a HASH_ALGO hex digest, see new_hasher()) when it was
+        computed while writing the file to skip re-reading it. *etag* and
+        *last_modified* are the response validators, kept so a later forced
+        sync can revalidate with a conditional GET.
+        """
+        entry = _build_entry(path, url, digest)
+        if etag:
+            entry["etag"] = etag
+        if last_modified:
+            entry["last_modified"] = last_modified
+        key = self._key(path)
+        with self._lock:
+            self._entries[key] = entry
+            self._mark_dirty()
+
+    def flush(self) -> None:
+        """Write any pending changes to disk now.
+
+        Only the snapshot of the entries is taken under the entry lock; the
+        serialization and file I/O happen outside it, so workers calling
+        record() never wait on a state write.
+        """
+        with self._save_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                snapshot = dict(self._entries)
+                self._dirty = False
+            try:
+                self._save(snapshot)
+            except BaseException:
+                with self._lock:
+                    self._dirty = True
+                raise
+
+    # ------------------------------------------------------------------
+    # Internal
+    # ------------------------------------------------------------------
+
+    def _mark_dirty(self) -> None:
+        """Schedule a deferred save. Caller must hold self._lock."""
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(_SAVE_INTERVAL, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _untracked_stat(self, path: Path) -> Optional[os.stat_result]:
+        """Return *path*'s stat if it is a non-empty file with no record, else None."""
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        if st.st_size == 0:
+            return None
+        key = self._key(path)
+        with self._lock:
+            if key in self._entries:
+                return None
+        return st
+
+    def _key(self, path: Path) -> str:
+        try:
+            return path.relative_to(self._output_dir).as_posix()
+        except ValueError:
+            return str(path)
+
+    def _load(self) -> None:
+        try:
+            data = self._path.read_bytes()
+        except OSError:
+            return
+        if not data.strip():
+            return
+        try:
+            raw = _loads(data)
+            if raw.get("schema_version") in _COMPATIBLE_VERSIONS:
+                self._entries = raw.get("entries", {})
+        except (ValueError, AttributeError):
+            self._entries = {}
+
+    def _save(self, entries: dict[str, dict]) -> None:
+        """Write entries to disk atomically. Caller must hold self._save_lock."""
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_suffix(".tmp")
+        with tmp.open("wb") as fh:
+            _dump({"schema_version": _SCHEMA_VERSION, "entries": entries}, fh)
+        os.replace(tmp, self._path)
+
+
+# ------------------------------------------------------------------
+# Module-level helpers
+# ------------------------------------------------------------------
+
+_HASH_BUFFER_SIZE = 1 << 20
+# Files above this size are hashed through a read-only memory map in one
+# update() call; below it the mapping setup costs more than it saves.
+_MMAP_THRESHOLD = 1 << 20
+
+
+def _loads(data: bytes):
+    """Parse UTF-8 JSON bytes, using orjson when it is installed."""
+    try:
+        import orjson  # type: ignore[import]
+    except ImportError:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+def _dump(payload: dict, fh: BinaryIO) -> None:
+    """Write payload to the binary file fh as compact UTF-8 JSON.
+
+    orjson serializes straight to bytes in one pass; without it, json.dump
+    streams into the file instead of building the whole document as a str.
+    """
+    try:
+        import orjson  # type: ignore[import]
+    except ImportError:
+        text = io.TextIOWrapper(fh, encoding="utf-8")
+        json.dump(payload, text, ensure_ascii=False, separators=(",", ":"))
+        text.detach()  # flushes, and leaves fh open for the caller to close
+        return
+    fh.write(orjson.dumps(payload))
+
+
+def write_atomic(path: Path, data: bytes | bytearray) -> None:
+    """Write data to path via a sibling .part file and os.replace().
+
+    A crash mid-write leaves at most a stray .part file, never a truncated
+    file under the real name that later runs would treat as present.
+    """
+    part = path.with_name(path.name + ".part")
+    try:
+        part.write_bytes(data)
+        os.replace(part, path)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+
+
+def new_hasher():
+    """Return an incremental hash object for HASH_ALGO (update()/hexdigest())."""
+    if HASH_ALGO == "blake3":
+        import blake3  # type: ignore[import]
+
+        return blake3.blake3(max_threads=blake3.blake3.AUTO)
+    return hashlib.sha256()
+
+
+def _hash_file(path: Path, algo: str = HASH_ALGO) -> str:
+    if algo == "blake3":
+        import blake3  # type: ignore[import]
+
+        # Memory-maps the file and hashes it with SIMD across all cores.
+        h = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        h.update_mmap(path)
+        return h.hexdigest()
+    return _sha256(path)
+
+
+def _update_from(h, fh: BinaryIO) -> None:
+    """Feed the unbuffered file fh to hash h through one reused buffer."""
+    buf = bytearray(_HASH_BUFFER_SIZE)
+    view = memoryview(buf)
+    while True:
+        n = fh.readinto(buf)
+        if not n:
+            break
+        h.update(view[:n])
+
+
+def _sha256(path: Path) -> str:
+    with path.open("rb", buffering=0) as fh:
+        if os.fstat(fh.fileno()).st_size > _MMAP_THRESHOLD:
+            try:
+                with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return hashlib.sha256(mm).hexdigest()
+            except (OSError, ValueError):
+                pass  # mapping refused (e.g. some network filesystems) — read instead
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+: read/update loop runs in C
+            return hashlib.file_digest(fh, "sha256").hexdigest()
+        h = hashlib.sha256()
+        _update_from(h, fh)
+        return h.hexdigest()
+
+
+def _build_entry(
+    path: Path,
+    url: str,
+    digest: Optional[str] = None,
+    st: Optional[os.stat_result] = None,
+) -> dict:
+    """Build a state entry; pass *st* when the caller has already stat'ed path."""
+    st = st or path.stat()
+    digest = digest or _hash_file(path)
+    return {
+        "hash_algo": HASH_ALGO,
+        HASH_ALGO: digest,
+        "url": url,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+    }